@@ -5,11 +5,12 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
 from ..core.config import settings
-from ..core.database import get_db
+from ..core.database import DBSession, get_session
+from ..core.replicas import request_user_id
 from ..schemas.user import TokenData, User
-from ..services.user_service import UserService
+from ..services.principal_cache import principal_cache
+from ..services.user_service import AsyncUserService
 
 # OAuth2 密码流
 oauth2_scheme = OAuth2PasswordBearer(
@@ -23,16 +24,15 @@ oauth2_scheme_required = OAuth2PasswordBearer(
 )
 
 
-async def get_current_user_optional(
-    token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+async def _resolve_user(token: str, db: DBSession) -> Optional[User]:
     """
-    获取当前用户（可选）
-    如果token无效或不存在，返回None
+    解析令牌并获取用户
+    优先使用认证用户缓存，未命中时查询数据库并写入缓存
     """
-    if not token:
-        return None
+    user = principal_cache.get(token)
+    if user is not None:
+        request_user_id.set(user.id)
+        return user
     
     try:
         payload = jwt.decode(
@@ -45,14 +45,37 @@ async def get_current_user_optional(
     except JWTError:
         return None
     
-    user_service = UserService(db)
-    user = user_service.get(int(token_data.username))
+    # 先读版本再查询，查询期间的更新会使写入的缓存项失效
+    version = principal_cache.version(int(token_data.username))
+    user_service = AsyncUserService(db)
+    db_user = await user_service.get(int(token_data.username))
+    if db_user is None:
+        return None
+    
+    user = User.model_validate(db_user)
+    principal_cache.set(token, user, expires_at=payload.get("exp", 0), version=version)
+    # 读写分离按用户判断读己之写
+    request_user_id.set(user.id)
     return user
 
 
+async def get_current_user_optional(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: DBSession = Depends(get_session)
+) -> Optional[User]:
+    """
+    获取当前用户（可选）
+    如果token无效或不存在，返回None
+    """
+    if not token:
+        return None
+    
+    return await _resolve_user(token, db)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme_required),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> User:
     """
     获取当前用户（必须）
@@ -64,19 +87,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        token_data = TokenData(username=user_id)
-    except JWTError:
-        raise credentials_exception
-    
-    user_service = UserService(db)
-    user = user_service.get(int(token_data.username))
+    user = await _resolve_user(token, db)
     if user is None:
         raise credentials_exception
     
@@ -100,4 +111,18 @@ async def get_current_active_superuser(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="权限不足"
         )
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+
+async def get_profiling_admin(
+    current_user: User = Depends(get_current_user),
+) -> User:
+    """
+    获取有权查看性能分析结果的当前用户（用户ID须在 PROFILING_ADMIN_USER_IDS 中）
+    """
+    if current_user.id not in settings.PROFILING_ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足"
+        )
+    return current_user
@@ -2,7 +2,7 @@
 API v1 路由汇总
 """
 from fastapi import APIRouter
-from .endpoints import auth, users, prompts, categories
+from .endpoints import auth, users, prompts, categories, events, profiles
 
 api_router = APIRouter()
 
@@ -10,4 +10,6 @@ api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["认证"])
 api_router.include_router(users.router, prefix="/users", tags=["用户"])
 api_router.include_router(prompts.router, prefix="/prompts", tags=["提示词"])
-api_router.include_router(categories.router, prefix="/categories", tags=["分类"]) 
\ No newline at end of file
+api_router.include_router(categories.router, prefix="/categories", tags=["分类"])
+api_router.include_router(events.router, prefix="/events", tags=["事件"]) 
+api_router.include_router(profiles.router, prefix="/profiles", tags=["性能分析"])
@@ -5,21 +5,29 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 from ....core import security
 from ....core.config import settings
-from ....core.database import get_db
+from ....core.database import DBSession, get_session
 from ....schemas.user import User, UserCreate, Token
-from ....services.user_service import UserService
+from ....services.user_service import AsyncUserService
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+def _busy_exception() -> HTTPException:
+    """密码哈希队列已满时的响应"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=User, summary="用户注册")
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     注册新用户
@@ -28,31 +36,34 @@ async def register(
     - **email**: 邮箱地址（唯一）
     - **password**: 密码
     """
-    user_service = UserService(db)
+    user_service = AsyncUserService(db)
     
     # 检查用户名是否已存在
-    if user_service.get_by_username(user_data.username):
+    if await user_service.get_by_username(user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名已存在"
         )
     
     # 检查邮箱是否已存在
-    if user_service.get_by_email(user_data.email):
+    if await user_service.get_by_email(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已存在"
         )
     
     # 创建用户
-    user = user_service.create(user_data)
+    try:
+        user = await user_service.create(user_data)
+    except security.PasswordHasherBusy:
+        raise _busy_exception()
     return user
 
 
 @router.post("/login", response_model=Token, summary="用户登录")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     用户登录获取访问令牌
@@ -60,10 +71,13 @@ async def login(
     - **username**: 用户名或邮箱
     - **password**: 密码
     """
-    user_service = UserService(db)
+    user_service = AsyncUserService(db)
     
     # 验证用户
-    user = user_service.authenticate(form_data.username, form_data.password)
+    try:
+        user = await user_service.authenticate(form_data.username, form_data.password)
+    except security.PasswordHasherBusy:
+        raise _busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,23 +1,37 @@
 """
 分类相关的API端点
 """
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ....core.database import get_db
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import TypeAdapter
+from ....core.cache import (
+    response_cache, cache_key, json_response, make_etag, etag_matches, not_modified
+)
+from ....core.config import settings
+from ....core.database import DBSession, get_session, get_read_session, may_read_stale
 from ....schemas.category import Category, CategoryCreate, CategoryUpdate
 from ....schemas.user import User
-from ....services.category_service import CategoryService
+from ....services.category_service import AsyncCategoryService
 from ....api.deps import get_current_user, get_current_user_optional
 
 router = APIRouter()
 
+category_list_adapter = TypeAdapter(List[Category])
+
+
+def _dump_categories(categories: List[Any]) -> bytes:
+    """序列化分类列表"""
+    return category_list_adapter.dump_json(
+        category_list_adapter.validate_python(categories, from_attributes=True)
+    )
+
 
 @router.get("/", response_model=List[Category], summary="获取分类列表")
 async def get_categories(
     parent_id: int = None,
     include_inactive: bool = False,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_read_session)
 ) -> Any:
     """
     获取分类列表
@@ -25,34 +39,67 @@ async def get_categories(
     - **parent_id**: 父分类ID（为空时获取顶级分类）
     - **include_inactive**: 是否包含未启用的分类
     """
-    category_service = CategoryService(db)
-    categories = category_service.get_list(
+    key = cache_key(view="list", parent_id=parent_id, include_inactive=include_inactive)
+    # 版本戳在查询前读取，写入缓存时据此判断查询期间是否有写操作
+    version = await response_cache.version("categories", settings.CACHE_TTL_CATEGORIES)
+    etag = make_etag(version, key)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    cached = await response_cache.get("categories", key)
+    if cached is not None:
+        return json_response(cached, precompress=True, etag=etag)
+    
+    category_service = AsyncCategoryService(db)
+    categories = await category_service.get_list(
         parent_id=parent_id,
         include_inactive=include_inactive
     )
-    return categories
+    body = _dump_categories(categories)
+    # 只读副本可能尚未同步近期的写入，此时的结果不缓存，也不返回 ETag
+    if await may_read_stale(db):
+        return json_response(body)
+    await response_cache.set("categories", key, body, settings.CACHE_TTL_CATEGORIES, version)
+    return json_response(body, precompress=True, etag=etag)
 
 
 @router.get("/tree", response_model=List[Category], summary="获取分类树")
 async def get_category_tree(
     include_inactive: bool = False,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_read_session)
 ) -> Any:
     """
     获取完整的分类树结构
     
     - **include_inactive**: 是否包含未启用的分类
+    
+    响应带有 ETag（分类的版本戳），携带 If-None-Match 且分类未变化时返回 304。
     """
-    category_service = CategoryService(db)
-    tree = category_service.get_tree(include_inactive=include_inactive)
-    return tree
+    key = cache_key(view="tree", include_inactive=include_inactive)
+    # 版本戳在查询前读取，写入缓存时据此判断查询期间是否有写操作
+    version = await response_cache.version("categories", settings.CACHE_TTL_CATEGORIES)
+    etag = make_etag(version, key)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    cached = await response_cache.get("categories", key)
+    if cached is not None:
+        return json_response(cached, precompress=True, etag=etag)
+    
+    category_service = AsyncCategoryService(db)
+    tree = await category_service.get_tree(include_inactive=include_inactive)
+    body = _dump_categories(tree)
+    # 只读副本可能尚未同步近期的写入，此时的结果不缓存，也不返回 ETag
+    if await may_read_stale(db):
+        return json_response(body)
+    await response_cache.set("categories", key, body, settings.CACHE_TTL_CATEGORIES, version)
+    return json_response(body, precompress=True, etag=etag)
 
 
 @router.post("/", response_model=Category, summary="创建分类")
 async def create_category(
     category_data: CategoryCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     创建新分类（需要登录）
@@ -63,11 +110,11 @@ async def create_category(
     - **sort_order**: 排序（默认0）
     - **icon**: 图标（可选）
     """
-    category_service = CategoryService(db)
+    category_service = AsyncCategoryService(db)
     
     # 检查父分类是否存在
     if category_data.parent_id:
-        parent = category_service.get(category_data.parent_id)
+        parent = await category_service.get(category_data.parent_id)
         if not parent:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -75,20 +122,20 @@ async def create_category(
             )
     
     # 创建分类
-    category = category_service.create(category_data)
+    category = await category_service.create(category_data)
     return category
 
 
 @router.get("/{category_id}", response_model=Category, summary="获取分类详情")
 async def get_category(
     category_id: int,
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_read_session)
 ) -> Any:
     """
     获取指定分类的详细信息
     """
-    category_service = CategoryService(db)
-    category = category_service.get(category_id)
+    category_service = AsyncCategoryService(db)
+    category = await category_service.get(category_id)
     
     if not category:
         raise HTTPException(
@@ -104,13 +151,13 @@ async def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     更新分类信息（需要登录）
     """
-    category_service = CategoryService(db)
-    category = category_service.get(category_id)
+    category_service = AsyncCategoryService(db)
+    category = await category_service.get(category_id)
     
     if not category:
         raise HTTPException(
@@ -120,7 +167,7 @@ async def update_category(
     
     # 检查父分类是否存在
     if category_update.parent_id:
-        parent = category_service.get(category_update.parent_id)
+        parent = await category_service.get(category_update.parent_id)
         if not parent:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -135,7 +182,7 @@ async def update_category(
             )
     
     # 更新分类
-    updated_category = category_service.update(category_id, category_update)
+    updated_category = await category_service.update(category_id, category_update)
     return updated_category
 
 
@@ -143,13 +190,13 @@ async def update_category(
 async def delete_category(
     category_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     删除分类（需要登录）
     """
-    category_service = CategoryService(db)
-    category = category_service.get(category_id)
+    category_service = AsyncCategoryService(db)
+    category = await category_service.get(category_id)
     
     if not category:
         raise HTTPException(
@@ -158,19 +205,19 @@ async def delete_category(
         )
     
     # 检查是否有子分类
-    if category_service.has_children(category_id):
+    if await category_service.has_children(category_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="该分类下还有子分类，无法删除"
         )
     
     # 检查是否有关联的提示词
-    if category_service.has_prompts(category_id):
+    if await category_service.has_prompts(category_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="该分类下还有提示词，无法删除"
         )
     
     # 删除分类
-    category_service.delete(category_id)
+    await category_service.delete(category_id)
     return {"message": "分类已删除"} 
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+变更事件推送的API端点
+"""
+import asyncio
+from typing import AsyncIterator, Optional
+import orjson
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from ....core.config import settings
+from ....services.event_broadcaster import Subscription, event_broadcaster
+
+router = APIRouter()
+
+# 可订阅的主题
+TOPICS = ("prompt", "category")
+
+
+def _format_event(event: dict) -> str:
+    """按 SSE 格式编码事件"""
+    data = orjson.dumps(event["data"]).decode()
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def _event_stream(
+    request: Request,
+    subscription: Subscription,
+    replay: Optional[list]
+) -> AsyncIterator[str]:
+    """先补发断线期间的事件，再持续推送实时事件，空闲时发送心跳"""
+    try:
+        if replay is None:
+            # 断线太久，缓冲中已没有需要补发的事件
+            yield "event: reset\ndata: {}\n\n"
+        else:
+            for event in replay:
+                yield _format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), settings.EVENTS_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield _format_event(event)
+    finally:
+        event_broadcaster.unsubscribe(subscription)
+
+
+@router.get("/stream", summary="订阅变更事件")
+async def stream_events(
+    request: Request,
+    topics: str = Query("prompt,category", description="订阅主题，逗号分隔：prompt,category"),
+    last_event_id: Optional[str] = Header(None, description="断线重连时由浏览器自动携带")
+):
+    """
+    以 Server-Sent Events 推送提示词和分类的变更
+
+    - **prompt.created / prompt.updated**: data 为提示词的最新内容（仅公开提示词）
+    - **prompt.deleted**: 提示词已删除（reason=deleted）或不再公开（reason=hidden）
+    - **category.created / category.updated / category.deleted**: 分类变更
+    - **reset**: 断线期间的事件已无法补发，客户端应通过 /prompts/changes 或列表接口重新同步
+    """
+    selected = tuple(dict.fromkeys(topic.strip() for topic in topics.split(",") if topic.strip()))
+    unknown = [topic for topic in selected if topic not in TOPICS]
+    if not selected or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的主题: {', '.join(unknown) or topics}"
+        )
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+
+    subscription, replay = event_broadcaster.subscribe(selected, last_event_id=last_id)
+    return StreamingResponse(
+        _event_stream(request, subscription, replay),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,59 @@
+"""
+性能分析结果的API端点
+"""
+import os
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from ....core.config import settings
+from ....core.profiling import profile_store, pstats_text
+from ....schemas.user import User
+from ....api.deps import get_profiling_admin
+
+router = APIRouter()
+
+
+def _ensure_enabled() -> None:
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="性能分析未启用")
+
+
+@router.get("/", summary="获取性能分析结果列表")
+async def list_profiles(
+    current_user: User = Depends(get_profiling_admin)
+) -> List[dict]:
+    """
+    最近的性能分析结果，新的在前（用户ID须在 PROFILING_ADMIN_USER_IDS 中）
+
+    在请求中携带 X-Profile 请求头（值为配置的令牌）即可分析该请求，结果ID在 X-Profile-Id 响应头中返回。
+    """
+    _ensure_enabled()
+    return await run_in_threadpool(profile_store.list)
+
+
+@router.get("/{profile_id}", summary="下载性能分析结果")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("raw", pattern="^(raw|text)$", description="raw：原始文件；text：pstats 文本摘要（仅 cprofile）"),
+    current_user: User = Depends(get_profiling_admin)
+) -> Any:
+    """
+    下载性能分析结果（用户ID须在 PROFILING_ADMIN_USER_IDS 中）
+
+    - sampling 模式为 speedscope JSON，可在 https://www.speedscope.app 打开
+    - cprofile 模式为 pstats 文件，可用 snakeviz 等工具打开，或指定 format=text 查看摘要
+    """
+    _ensure_enabled()
+    found = profile_store.find(profile_id)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分析结果不存在")
+    mode, path = found
+
+    if format == "text":
+        if mode != "cprofile":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="只有 cprofile 结果支持文本摘要")
+        return PlainTextResponse(await run_in_threadpool(pstats_text, path))
+
+    media_type = "application/json" if mode == "sampling" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
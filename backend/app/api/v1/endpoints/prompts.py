@@ -1,18 +1,89 @@
 """
 提示词相关的API端点
 """
+import time
 from typing import Any, Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from ....core.database import get_db
-from ....schemas.prompt import Prompt, PromptCreate, PromptUpdate, PromptList
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from ....core.cache import (
+    response_cache, cache_key, json_response, make_etag, etag_matches, not_modified
+)
+from ....core.config import settings
+from ....core.database import DBSession, get_session, get_read_session, may_read_stale
+from ....schemas.prompt import (
+    Prompt, PromptCreate, PromptUpdate, PromptList, PromptRowPage,
+    PromptBatch, PromptBatchRequest, PromptChangeFeed,
+    PROMPT_FIELDS, SUMMARY_FIELDS, parse_fields, parse_expand, dump_json, row_to_dict
+)
 from ....schemas.user import User
-from ....services.prompt_service import PromptService
+from ....services.prompt_service import AsyncPromptService
+from ....services.prompt_change_service import AsyncPromptChangeService
 from ....api.deps import get_current_user, get_current_user_optional
 
 router = APIRouter()
 
 
+def _selected_fields(fields: Optional[str]) -> Optional[tuple]:
+    """解析并校验 fields 参数"""
+    if fields is None:
+        return None
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+# 展开的关联对应的缓存命名空间，其版本戳参与 ETag
+EXPAND_NAMESPACES = {
+    "author": "users",
+    "category": "categories",
+}
+
+
+async def _relation_versions(relations: tuple, ttl: int) -> list:
+    """展开的关联的版本戳"""
+    return [await response_cache.version(EXPAND_NAMESPACES[relation], ttl) for relation in relations]
+
+
+def _detail_etag(prompt: Any, selected: Optional[tuple], versions: list) -> str:
+    """
+    由提示词的版本列生成详情的 ETag
+
+    SQLite 中 updated_at 只精确到秒，同时加入查询前读取的提示词写操作和展开的关联的版本戳，
+    同一秒内的多次修改也能区分。
+    """
+    return make_etag(
+        prompt.id, prompt.updated_at, prompt.usage_count, prompt.rating_avg, prompt.rating_count,
+        selected, versions
+    )
+
+
+def _check_visible(prompt: Any, current_user: Optional[User]) -> None:
+    """不存在或无权访问时返回404"""
+    if not prompt or (
+        not prompt.is_public and (not current_user or current_user.id != prompt.author_id)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="提示词不存在"
+        )
+
+
+def _selected_expand(expand: Optional[str]) -> tuple:
+    """解析并校验 expand 参数"""
+    if not expand:
+        return ()
+    try:
+        return parse_expand(expand)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.get("/", response_model=PromptList, summary="获取提示词列表")
 async def get_prompts(
     page: int = Query(1, ge=1, description="页码"),
@@ -21,20 +92,73 @@ async def get_prompts(
     search: Optional[str] = Query(None, description="搜索关键词"),
     is_public: Optional[bool] = Query(None, description="是否公开"),
     is_featured: bool = Query(False, description="是否仅显示精选"),
+    sort: Optional[str] = Query(
+        None, pattern="^(newest|usage|rating|featured)$", description="排序方式"
+    ),
+    cursor: Optional[str] = Query(None, description="分页游标（传空字符串开始游标分页）"),
+    include_total: Optional[bool] = Query(None, description="是否返回总数"),
+    count_mode: str = Query("exact", pattern="^(exact|estimate)$", description="总数计算方式"),
+    view: str = Query("full", pattern="^(full|summary)$", description="返回视图"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔"),
+    expand: Optional[str] = Query(None, description="展开关联，逗号分隔：author,category"),
+    if_none_match: Optional[str] = Header(None),
     current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_read_session)
 ) -> Any:
     """
     获取提示词列表
     
     - **page**: 页码（从1开始）
     - **size**: 每页数量（1-100）
+    - **cursor**: 游标分页，传入上一页返回的 next_cursor；传空字符串获取第一页
+    - **include_total**: 是否返回总数（页码分页默认返回，游标分页默认不返回）
+    - **count_mode**: exact 精确总数；estimate 结果集很大时返回近似总数（total_estimated 为 true，仅 PostgreSQL，其他数据库返回精确总数）
+    - **view**: full 完整字段；summary 仅返回列表字段（不含正文、示例等），结构见 PromptSummary
+    - **fields**: 只返回指定字段，如 id,name_zh,tags（优先于 view）
+    - **expand**: 嵌入关联摘要，author 为作者，category 为分类；每个关联对整页只查询一次
     - **category_id**: 按分类筛选
     - **search**: 搜索关键词（在名称和描述中搜索）
     - **is_public**: 是否公开（仅登录用户可见非公开的自己的提示词）
     - **is_featured**: 是否仅显示精选
+    
+    响应带有 ETag，携带 If-None-Match 且提示词未变化时返回 304，无需查询数据库。
     """
-    prompt_service = PromptService(db)
+    selected = _selected_fields(fields)
+    if selected is None and view == "summary":
+        selected = SUMMARY_FIELDS
+    relations = _selected_expand(expand)
+    if selected is None and relations:
+        selected = PROMPT_FIELDS
+    
+    # 请求参数和展开的关联的版本戳决定响应体，同时用于缓存键和 ETag
+    ttl = settings.CACHE_TTL_PROMPT_LIST
+    params_key = cache_key(
+        page=page, size=size, category_id=category_id, search=search,
+        is_featured=is_featured, sort=sort, cursor=cursor,
+        include_total=include_total, count_mode=count_mode, fields=selected,
+        expand=relations, relation_versions=await _relation_versions(relations, ttl)
+    )
+    
+    # 集合的 ETag 由提示词写操作的版本戳、请求参数和当前用户决定；
+    # 使用次数的变化不改变版本戳，ETag 按列表缓存时长分段，与缓存的响应体一样最多滞后一个周期
+    # 版本戳在查询前读取，写入缓存时据此判断查询期间是否有写操作
+    version = await response_cache.version("prompt_list", ttl)
+    etag = make_etag(
+        version, int(time.time() // ttl),
+        params_key, is_public, current_user.id if current_user else None
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    # 匿名请求的结果与用户无关，可以缓存
+    key = None
+    if current_user is None:
+        key = params_key
+        cached = await response_cache.get("prompt_list", key)
+        if cached is not None:
+            return json_response(cached, precompress=True, etag=etag)
+    
+    prompt_service = AsyncPromptService(db)
     
     # 构建查询条件
     filters = {}
@@ -55,15 +179,43 @@ async def get_prompts(
         # 未登录用户只能看到公开的提示词
         filters["is_public"] = True
     
-    result = prompt_service.get_list(page=page, size=size, **filters)
-    return result
+    if include_total is None:
+        include_total = cursor is None
+    
+    try:
+        result = await prompt_service.get_list(
+            page=page,
+            size=size,
+            sort=sort,
+            cursor=cursor,
+            include_total=include_total,
+            count_mode=count_mode,
+            fields=selected,
+            expand=relations,
+            **filters
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if isinstance(result, PromptRowPage):
+        body = result.to_json()
+    else:
+        body = result.model_dump_json().encode()
+    # 只读副本可能尚未同步近期的写入，此时的结果不缓存，也不返回按版本戳生成的 ETag
+    fresh = not await may_read_stale(db)
+    if key is not None and fresh:
+        await response_cache.set("prompt_list", key, body, ttl, version)
+    return json_response(body, precompress=key is not None and fresh, etag=etag if fresh else None)
 
 
 @router.post("/", response_model=Prompt, summary="创建提示词")
 async def create_prompt(
     prompt_data: PromptCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     创建新的提示词
@@ -74,50 +226,209 @@ async def create_prompt(
     - **category_id**: 分类ID（必填）
     - **is_public**: 是否公开（默认false）
     """
-    prompt_service = PromptService(db)
+    prompt_service = AsyncPromptService(db)
     
     # 检查分类是否存在
-    if not prompt_service.category_exists(prompt_data.category_id):
+    if not await prompt_service.category_exists(prompt_data.category_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="分类不存在"
         )
     
     # 创建提示词
-    prompt = prompt_service.create(prompt_data, author_id=current_user.id)
+    prompt = await prompt_service.create(prompt_data, author_id=current_user.id)
     return prompt
 
 
+async def _get_batch(
+    prompt_ids: List[int],
+    selected: Optional[tuple],
+    relations: tuple,
+    current_user: Optional[User],
+    db: DBSession
+) -> Any:
+    """批量获取提示词并合并计入使用次数"""
+    if not prompt_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids 不能为空"
+        )
+    if len(prompt_ids) > settings.PROMPT_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一次最多获取 {settings.PROMPT_BATCH_MAX_IDS} 个提示词"
+        )
+    
+    if selected is None and relations:
+        selected = PROMPT_FIELDS
+    
+    prompt_service = AsyncPromptService(db)
+    items = await prompt_service.get_many(
+        prompt_ids,
+        current_user_id=current_user.id if current_user else None,
+        fields=selected
+    )
+    found = {item.id for item in items}
+    missing = [prompt_id for prompt_id in dict.fromkeys(prompt_ids) if prompt_id not in found]
+    
+    # 增加使用次数
+    await prompt_service.increment_usage_counts([item.id for item in items])
+    
+    if selected is None:
+        return PromptBatch(items=items, missing=missing)
+    expansions = await prompt_service.load_expansions(items, relations) if relations else None
+    return json_response(dump_json({
+        "items": [row_to_dict(item, selected, expansions) for item in items],
+        "missing": missing,
+    }))
+
+
+@router.get("/batch", response_model=PromptBatch, summary="批量获取提示词")
+async def get_prompts_batch(
+    ids: List[str] = Query(..., description="提示词ID，逗号分隔或重复传参"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔"),
+    expand: Optional[str] = Query(None, description="展开关联，逗号分隔：author,category"),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: DBSession = Depends(get_read_session)
+) -> Any:
+    """
+    批量获取提示词（可见性规则与详情相同）
+    
+    - **ids**: 提示词ID，如 ids=1,2,3
+    - **fields**: 只返回指定字段
+    - **expand**: 嵌入关联摘要（author、category）
+    
+    不存在或无权访问的ID列在 missing 中。
+    """
+    try:
+        prompt_ids = [int(value) for item in ids for value in item.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids 必须为整数"
+        )
+    return await _get_batch(
+        prompt_ids, _selected_fields(fields), _selected_expand(expand), current_user, db
+    )
+
+
+@router.post("/batch", response_model=PromptBatch, summary="批量获取提示词（长列表）")
+async def post_prompts_batch(
+    batch: PromptBatchRequest,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: DBSession = Depends(get_read_session)
+) -> Any:
+    """
+    批量获取提示词，ID较多时使用
+    
+    - **ids**: 提示词ID列表
+    - **fields**: 只返回指定字段（可选）
+    - **expand**: 嵌入关联摘要（可选）
+    """
+    selected = _selected_fields(",".join(batch.fields)) if batch.fields is not None else None
+    relations = _selected_expand(",".join(batch.expand or ()))
+    return await _get_batch(batch.ids, selected, relations, current_user, db)
+
+
+@router.get("/changes", response_model=PromptChangeFeed, summary="获取提示词变更")
+async def get_prompt_changes(
+    since: Optional[str] = Query(None, description="上一批返回的 next_cursor"),
+    limit: int = Query(100, ge=1, le=500, description="每批数量"),
+    db: DBSession = Depends(get_session)
+) -> Any:
+    """
+    增量同步公开提示词
+    
+    - **since**: 不传时从头返回全部公开提示词，之后传入上一批的 next_cursor
+    - **limit**: 每批最多返回的变更数量
+    
+    upsert 携带提示词的最新内容；delete 表示提示词已删除（deleted）或不再公开（hidden）。
+    变更按时间顺序返回，has_more 为 true 时应立即继续拉取。
+    """
+    try:
+        return await AsyncPromptChangeService(db).get_changes(since, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.get("/{prompt_id}", response_model=Prompt, summary="获取提示词详情")
 async def get_prompt(
     prompt_id: int,
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔"),
+    expand: Optional[str] = Query(None, description="展开关联，逗号分隔：author,category"),
+    if_none_match: Optional[str] = Header(None),
     current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_read_session)
 ) -> Any:
     """
     获取指定提示词的详细信息
+    
+    - **fields**: 只返回指定字段，如 id,name_zh,content
+    - **expand**: 嵌入关联摘要（author、category）
+    
+    响应带有 ETag，携带 If-None-Match 且提示词未变化时返回 304，不读取完整内容。
     """
-    prompt_service = PromptService(db)
-    prompt = prompt_service.get(prompt_id)
+    selected = _selected_fields(fields)
+    relations = _selected_expand(expand)
+    if selected is None and relations:
+        selected = PROMPT_FIELDS
+    prompt_service = AsyncPromptService(db)
     
-    if not prompt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="提示词不存在"
-        )
+    # 只缓存公开的提示词，ETag 与响应体一同缓存；命中时同样计入使用次数
+    # 展开的关联的版本戳加入缓存键，作者或分类更新后不再命中旧的响应体
+    # 版本戳在查询前读取，写入缓存时据此判断查询期间是否有写操作
+    ttl = settings.CACHE_TTL_PROMPT_DETAIL
+    version = await response_cache.version("prompt_detail", ttl)
+    relation_versions = await _relation_versions(relations, ttl)
+    key = str(prompt_id)
+    if selected is not None:
+        key = f"{key}:{','.join(selected)}:{','.join(relations)}"
+        if relations:
+            key = f"{key}:{','.join(relation_versions)}"
+    cached = await response_cache.get("prompt_detail", key)
+    cached_etag = await response_cache.get("prompt_detail", f"{key}:etag")
+    if cached is not None and cached_etag is not None:
+        etag = cached_etag.decode()
+        await prompt_service.increment_usage_count(prompt_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return json_response(cached, precompress=True, etag=etag)
+    
+    # 条件请求先只读取版本列
+    if if_none_match:
+        row_version = await prompt_service.get_version(prompt_id)
+        _check_visible(row_version, current_user)
+        etag = _detail_etag(row_version, selected, [version, *relation_versions])
+        if etag_matches(if_none_match, etag):
+            await prompt_service.increment_usage_count(prompt_id)
+            return not_modified(etag)
+    
+    if selected is None:
+        prompt = await prompt_service.get(prompt_id)
+    else:
+        prompt = await prompt_service.get_fields(prompt_id, selected)
     
     # 检查访问权限
-    if not prompt.is_public:
-        if not current_user or current_user.id != prompt.author_id:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="提示词不存在"
-            )
+    _check_visible(prompt, current_user)
     
     # 增加使用次数
-    prompt_service.increment_usage_count(prompt_id)
+    await prompt_service.increment_usage_count(prompt_id)
     
-    return prompt
+    etag = _detail_etag(prompt, selected, [version, *relation_versions])
+    if selected is not None:
+        expansions = await prompt_service.load_expansions([prompt], relations) if relations else None
+        body = dump_json(row_to_dict(prompt, selected, expansions))
+    else:
+        body = Prompt.model_validate(prompt).model_dump_json().encode()
+    # 只读副本可能尚未同步近期的写入时不缓存；ETag 由读到的版本列生成，副本同步后自然变化
+    cacheable = prompt.is_public and not await may_read_stale(db)
+    if cacheable:
+        await response_cache.set("prompt_detail", key, body, ttl, version)
+        await response_cache.set("prompt_detail", f"{key}:etag", etag.encode(), ttl, version)
+    return json_response(body, precompress=cacheable, etag=etag)
 
 
 @router.put("/{prompt_id}", response_model=Prompt, summary="更新提示词")
@@ -125,13 +436,13 @@ async def update_prompt(
     prompt_id: int,
     prompt_update: PromptUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     更新提示词信息
     """
-    prompt_service = PromptService(db)
-    prompt = prompt_service.get(prompt_id)
+    prompt_service = AsyncPromptService(db)
+    prompt = await prompt_service.get(prompt_id)
     
     if not prompt:
         raise HTTPException(
@@ -147,14 +458,14 @@ async def update_prompt(
         )
     
     # 检查分类是否存在
-    if prompt_update.category_id and not prompt_service.category_exists(prompt_update.category_id):
+    if prompt_update.category_id and not await prompt_service.category_exists(prompt_update.category_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="分类不存在"
         )
     
     # 更新提示词
-    updated_prompt = prompt_service.update(prompt_id, prompt_update)
+    updated_prompt = await prompt_service.update(prompt_id, prompt_update)
     return updated_prompt
 
 
@@ -162,13 +473,13 @@ async def update_prompt(
 async def delete_prompt(
     prompt_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     删除提示词
     """
-    prompt_service = PromptService(db)
-    prompt = prompt_service.get(prompt_id)
+    prompt_service = AsyncPromptService(db)
+    prompt = await prompt_service.get(prompt_id)
     
     if not prompt:
         raise HTTPException(
@@ -184,14 +495,14 @@ async def delete_prompt(
         )
     
     # 删除提示词
-    prompt_service.delete(prompt_id)
+    await prompt_service.delete(prompt_id)
     return {"message": "提示词已删除"}
 
 
 @router.get("/user/{user_id}", response_model=List[Prompt])
-def get_user_prompts(
+async def get_user_prompts(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -204,6 +515,6 @@ def get_user_prompts(
             detail="没有权限访问其他用户的提示词"
         )
     
-    prompt_service = PromptService(db)
-    prompts = prompt_service.get_prompts_by_user(user_id=user_id)
+    prompt_service = AsyncPromptService(db)
+    prompts = await prompt_service.get_prompts_by_user(user_id=user_id)
     return prompts 
\ No newline at end of file
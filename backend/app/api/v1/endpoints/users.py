@@ -3,10 +3,9 @@
 """
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ....core.database import get_db
+from ....core.database import DBSession, get_session, get_read_session
 from ....schemas.user import User, UserUpdate
-from ....services.user_service import UserService
+from ....services.user_service import AsyncUserService
 from ....api.deps import get_current_user
 
 router = APIRouter()
@@ -26,7 +25,7 @@ async def get_current_user_info(
 async def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ) -> Any:
     """
     更新当前登录用户的信息
@@ -35,11 +34,11 @@ async def update_current_user(
     - **email**: 新邮箱地址（可选）
     - **avatar_url**: 新头像URL（可选）
     """
-    user_service = UserService(db)
+    user_service = AsyncUserService(db)
     
     # 检查用户名是否已被其他用户使用
     if user_update.username:
-        existing_user = user_service.get_by_username(user_update.username)
+        existing_user = await user_service.get_by_username(user_update.username)
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -48,7 +47,7 @@ async def update_current_user(
     
     # 检查邮箱是否已被其他用户使用
     if user_update.email:
-        existing_user = user_service.get_by_email(user_update.email)
+        existing_user = await user_service.get_by_email(user_update.email)
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -56,20 +55,20 @@ async def update_current_user(
             )
     
     # 更新用户信息
-    updated_user = user_service.update(current_user.id, user_update)
+    updated_user = await user_service.update(current_user.id, user_update)
     return updated_user
 
 
 @router.get("/{user_id}", response_model=User, summary="获取指定用户信息")
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_read_session)
 ) -> Any:
     """
     获取指定用户的公开信息
     """
-    user_service = UserService(db)
-    user = user_service.get(user_id)
+    user_service = AsyncUserService(db)
+    user = await user_service.get(user_id)
     
     if not user:
         raise HTTPException(
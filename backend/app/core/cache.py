@@ -0,0 +1,421 @@
+"""
+响应缓存
+
+两级缓存：进程内 LRU 为第一级，可选的共享后端（Redis，测试时可用内存实现替代）为第二级。
+缓存按命名空间组织，写操作通过递增命名空间版本号使其下所有条目失效。
+共享后端是同步客户端，在事件循环中的访问都交给线程池执行，后端响应慢时不阻塞其他请求。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from fastapi import Response, status
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
+from .compression import accepted_encoding, compress
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 共享后端中记录近期失效的键，过期时间为只读副本可能尚未同步的时长
+INVALIDATED_KEY = "cache:invalidated"
+
+
+class LRUCache:
+    """带过期时间和容量上限的进程内 LRU 缓存"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存值，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix: tuple) -> None:
+        """删除键以指定元组开头的条目"""
+        with self._lock:
+            for key in [key for key in self._entries if key[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+class MemoryPipeline:
+    """MemoryBackend 的事务管道：命令先排队，execute 时持锁依次执行"""
+
+    def __init__(self, backend: "MemoryBackend"):
+        self._backend = backend
+        self._commands: list = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._backend, name)
+
+        def queue(*args: Any, **kwargs: Any) -> "MemoryPipeline":
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        """依次执行排队的命令；任一命令失败时撤销之前的修改，与 MULTI 事务一致"""
+        commands, self._commands = self._commands, []
+        data = self._backend._data
+        with self._backend._lock:
+            keys = {args[0] for _, args, _ in commands if args}
+            snapshot = {key: (dict(data[key][0]), data[key][1])
+                        if isinstance(data[key][0], dict) else data[key]
+                        for key in keys if key in data}
+            try:
+                return [method(*args, **kwargs) for method, args, kwargs in commands]
+            except Exception:
+                for key in keys:
+                    data.pop(key, None)
+                data.update(snapshot)
+                raise
+
+    def __enter__(self) -> "MemoryPipeline":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._commands = []
+
+
+class MemoryBackend:
+    """共享后端的内存实现，接口与 Redis 客户端的子集一致，用于测试和单进程部署"""
+
+    def __init__(self):
+        # 可重入，管道执行时持有
+        self._lock = threading.RLock()
+        self._data: Dict[str, tuple] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value, expires_at = self._data.get(key, (b"0", None))
+            value = str(int(value) + 1).encode()
+            self._data[key] = (value, expires_at)
+            return int(value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def exists(self, key: str) -> int:
+        return int(self.get(key) is not None)
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            mapping, expires_at = self._data.setdefault(key, ({}, None))
+            mapping[field] = mapping.get(field, 0) + amount
+            return mapping[field]
+
+    def hgetall(self, key: str) -> Dict[str, int]:
+        with self._lock:
+            mapping, _ = self._data.get(key, ({}, None))
+            return dict(mapping)
+
+    def pipeline(self, transaction: bool = True) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    def flushdb(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def create_shared_backend(name: str):
+    """
+    根据配置创建共享缓存后端
+
+    Args:
+        name: redis / memory，空字符串表示不使用共享后端
+    """
+    if not name:
+        return None
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.warning("未安装redis，共享缓存已禁用")
+            return None
+        return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+    raise ValueError(f"未知的缓存后端: {name}")
+
+
+class ResponseCache:
+    """两级响应缓存"""
+
+    def __init__(self, shared=None):
+        self.local = LRUCache(settings.CACHE_LOCAL_MAX_ENTRIES)
+        self.shared = shared
+        self._instance = uuid.uuid4().hex[:8]
+        self._local_versions: Dict[str, int] = {}
+        self._invalidated_at = float("-inf")
+        # 按命名空间统计命中（任一级命中即算命中）
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def _version(self, namespace: str) -> int:
+        value = self.shared.get(f"cache:version:{namespace}")
+        return int(value) if value else 0
+
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """读取缓存：先查本地，再查共享后端并回填本地"""
+        if not settings.CACHE_ENABLED:
+            return None
+        value = self.local.get((namespace, key))
+        if value is None and self.shared is not None:
+            value = await run_in_threadpool(self._get_shared, namespace, key)
+        if value is None:
+            self.misses[namespace] += 1
+        else:
+            self.hits[namespace] += 1
+        return value
+
+    def _get_shared(self, namespace: str, key: str) -> Optional[bytes]:
+        """读取共享后端并回填本地"""
+        try:
+            version = self._version(namespace)
+            value = self.shared.get(f"cache:{namespace}:{version}:{key}")
+        except Exception as e:
+            logger.warning("读取共享缓存失败: %s", e)
+            return None
+        if value is not None:
+            self.local.set((namespace, key), value, self._local_ttl(settings.CACHE_LOCAL_TTL_SECONDS))
+        return value
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl: int, version: str) -> None:
+        """
+        写入两级缓存
+
+        Args:
+            version: 查询数据库前读取的版本戳；写入时版本已变化说明查询期间有写操作，不写入
+        """
+        if not settings.CACHE_ENABLED:
+            return
+        local_version = self._local_versions.get(namespace, 0)
+        if self.shared is not None:
+            if not await run_in_threadpool(self._set_shared, namespace, key, value, ttl, version):
+                return
+        elif version != await self.version(namespace, ttl):
+            return
+        # 等待共享后端期间本进程的写操作同样使其作废
+        if self._local_versions.get(namespace, 0) == local_version:
+            self.local.set((namespace, key), value, self._local_ttl(ttl))
+
+    def _set_shared(self, namespace: str, key: str, value: bytes, ttl: int, version: str) -> bool:
+        """版本未变化时写入共享后端，返回是否写入"""
+        try:
+            current = self._version(namespace)
+            if version != f"s{current}":
+                return False
+            self.shared.set(f"cache:{namespace}:{current}:{key}", value, ex=ttl)
+        except Exception as e:
+            logger.warning("写入共享缓存失败: %s", e)
+            return False
+        return True
+
+    async def version(self, namespace: str, ttl: int) -> str:
+        """
+        命名空间的版本戳，写操作使其失效后改变，用于生成 ETag
+
+        没有共享后端时版本戳只在本进程内有效：附带进程标识避免与其他进程误匹配，
+        并按缓存时长分段，使其他进程写入后的过期时间与本地缓存一致。
+
+        Args:
+            ttl: 使用该版本戳的响应的缓存时长
+        """
+        if self.shared is not None:
+            try:
+                return f"s{await run_in_threadpool(self._version, namespace)}"
+            except Exception as e:
+                logger.warning("读取共享缓存版本失败: %s", e)
+        bucket = int(time.time() // ttl)
+        return f"{self._instance}.{self._local_versions.get(namespace, 0)}.{bucket}"
+
+    def invalidate(self, *namespaces: str) -> None:
+        """
+        使命名空间下的所有条目失效
+
+        由服务的同步代码调用，本地条目立即失效。异步会话通过 run_sync 在事件循环线程中执行服务，
+        此时共享后端的版本号在线程池中更新，服务代码等待其完成，事件循环继续处理其他请求。
+        """
+        for namespace in namespaces:
+            self.local.delete_prefix((namespace,))
+            self._local_versions[namespace] = self._local_versions.get(namespace, 0) + 1
+        self._invalidated_at = time.monotonic()
+        if self.shared is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._invalidate_shared(namespaces)
+            return
+        try:
+            await_only(run_in_threadpool(self._invalidate_shared, namespaces))
+        except MissingGreenlet:
+            loop.run_in_executor(None, self._invalidate_shared, namespaces)
+
+    def _invalidate_shared(self, namespaces: Tuple[str, ...]) -> None:
+        for namespace in namespaces:
+            try:
+                self.shared.incr(f"cache:version:{namespace}")
+            except Exception as e:
+                logger.warning("更新共享缓存版本失败: %s", e)
+        if settings.DATABASE_REPLICA_URLS:
+            # 供其他进程判断只读副本是否可能尚未同步
+            try:
+                self.shared.set(INVALIDATED_KEY, b"1", ex=math.ceil(replica_stale_seconds()))
+            except Exception as e:
+                logger.warning("记录共享缓存失效时间失败: %s", e)
+
+    async def recently_invalidated(self) -> bool:
+        """只读副本可能尚未同步的时间窗口内是否有写入使缓存失效（包括其他进程的写入）"""
+        if time.monotonic() - self._invalidated_at < replica_stale_seconds():
+            return True
+        if self.shared is None:
+            return False
+        try:
+            return bool(await run_in_threadpool(self.shared.exists, INVALIDATED_KEY))
+        except Exception as e:
+            logger.warning("读取共享缓存失效时间失败: %s", e)
+            return True
+
+    def clear(self) -> None:
+        """清空本地缓存"""
+        self.local.clear()
+
+    def _local_ttl(self, ttl: int) -> int:
+        # 有共享后端时，本地条目只短暂保留，以限制其他进程写入后的不一致时间
+        if self.shared is None:
+            return ttl
+        return min(ttl, settings.CACHE_LOCAL_TTL_SECONDS)
+
+
+def replica_stale_seconds() -> float:
+    """写入后只读副本可能仍返回旧数据的时长"""
+    return max(settings.REPLICA_MAX_LAG_SECONDS, settings.READ_YOUR_WRITES_SECONDS)
+
+
+def cache_key(**params: Any) -> str:
+    """由请求参数生成缓存键"""
+    payload = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class PrecompressedCache(LRUCache):
+    """按内容缓存响应体的压缩结果，缓存命中的响应无需重复压缩"""
+
+    def __init__(self):
+        super().__init__(settings.PRECOMPRESSED_CACHE_MAX_ENTRIES)
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        # bytes 对象会缓存自身的哈希值，同一缓存条目重复查找时无需重新计算
+        key = (hash(body), len(body), encoding)
+        entry = self.get(key)
+        if entry is not None and (entry[0] is body or entry[0] == body):
+            return entry[1]
+        compressed = compress(body, encoding)
+        self.set(key, (body, compressed), settings.PRECOMPRESSED_CACHE_TTL_SECONDS)
+        return compressed
+
+
+def make_etag(*parts: Any) -> str:
+    """由版本信息生成强 ETag"""
+    payload = json.dumps(parts, default=str, ensure_ascii=False)
+    return f'"{hashlib.sha1(payload.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否与 ETag 匹配（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """返回 304 Not Modified"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
+def json_response(body: bytes, precompress: bool = False, etag: Optional[str] = None) -> Response:
+    """
+    直接返回已序列化的 JSON
+
+    Args:
+        precompress: 响应体来自响应缓存、会被重复返回时，复用其压缩结果
+        etag: 响应的 ETag，客户端据此发起条件请求
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+    encoding = accepted_encoding.get()
+    if precompress and encoding and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        body = precompressed_cache.get_or_compress(body, encoding)
+        headers.update({"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# 全局响应缓存实例
+response_cache = ResponseCache(create_shared_backend(settings.CACHE_SHARED_BACKEND))
+
+# 全局预压缩缓存实例
+precompressed_cache = PrecompressedCache()
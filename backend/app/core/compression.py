@@ -0,0 +1,136 @@
+"""
+响应压缩
+
+按 Accept-Encoding 协商 br / gzip，只压缩一次性发送且超过阈值的响应；
+流式响应（如 SSE）原样透传。未安装 brotli 时只使用 gzip。
+"""
+import gzip
+from contextvars import ContextVar
+from typing import Optional
+from .config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 当前请求协商得到的编码，供直接构造响应的代码使用预压缩内容
+accepted_encoding: ContextVar[Optional[str]] = ContextVar("accepted_encoding", default=None)
+
+# 可压缩的内容类型前缀
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择编码
+
+    Returns:
+        br / gzip，客户端不接受时返回None
+    """
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if name not in supported:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        # q 相同时按 supported 中的顺序优先 br
+        if q > best_q or (q == best_q and best is not None and supported.index(name) < supported.index(best)):
+            best, best_q = name, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """按指定编码压缩"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """响应压缩中间件（纯 ASGI 实现，不缓冲流式响应）"""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = negotiate_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = accepted_encoding.set(encoding)
+        try:
+            await self.app(scope, receive, _CompressingSender(send, encoding, self.minimum_size))
+        finally:
+            accepted_encoding.reset(token)
+
+
+class _CompressingSender:
+    """暂存响应头，收到第一段响应体后决定是否压缩"""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        self.passthrough = True
+        start, self.start_message = self.start_message, None
+        body = message.get("body", b"")
+        if message.get("more_body", False) or not self._compressible(start, body):
+            await self.send(start)
+            await self.send(message)
+            return
+
+        body = compress(body, self.encoding)
+        vary = b"Accept-Encoding"
+        headers = []
+        for name, value in start["headers"]:
+            if name == b"vary":
+                vary = value + b", " + vary
+            elif name != b"content-length":
+                headers.append((name, value))
+        headers += [
+            (b"content-encoding", self.encoding.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (b"vary", vary),
+        ]
+        await self.send({**start, "headers": headers})
+        await self.send({**message, "body": body})
+
+    def _compressible(self, start, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(COMPRESSIBLE_TYPES)
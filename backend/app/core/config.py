@@ -15,16 +15,57 @@ class Settings(BaseSettings):
     
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./prompt_ai.db"
+    DATABASE_ASYNC: bool = False  # 使用异步驱动（aiosqlite / asyncpg）
+    ASYNC_DATABASE_URL: Optional[str] = None  # 为空时由 DATABASE_URL 推导
+    
+    # SQLite 配置（DATABASE_URL 为 SQLite 文件数据库时生效）
+    SQLITE_TUNING_ENABLED: bool = True  # WAL 模式、读写分离连接池、单一写入连接
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # WAL 模式下 NORMAL 不会损坏数据库，断电时可能丢失最后提交的事务
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536  # 每个连接的页缓存
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    SQLITE_READ_POOL_SIZE: int = 8
+    SQLITE_WRITE_TIMEOUT_SECONDS: float = 30.0  # 等待写入连接的最长时间
+    
+    # 只读副本配置
+    DATABASE_REPLICA_URLS: list[str] = []  # 只读端点的查询按轮询分配到这些副本
+    REPLICA_HEALTH_CHECK_SECONDS: int = 10
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # PostgreSQL 副本复制延迟超过该值时停用，0 表示不检查
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # 用户写入后该时长内的读取使用主库
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379"
     
+    # 响应缓存配置
+    CACHE_ENABLED: bool = True
+    CACHE_SHARED_BACKEND: str = ""  # redis / memory，为空时只使用进程内缓存
+    CACHE_LOCAL_MAX_ENTRIES: int = 2048
+    CACHE_LOCAL_TTL_SECONDS: int = 5  # 启用共享缓存时本地条目的最长保留时间
+    CACHE_TTL_PROMPT_LIST: int = 30
+    CACHE_TTL_PROMPT_DETAIL: int = 60
+    CACHE_TTL_CATEGORIES: int = 300
+    
+    # 使用次数计数配置
+    USAGE_COUNTER_BUFFERED: bool = True  # 关闭时每次访问直接写入数据库
+    USAGE_COUNTER_SHARED_BACKEND: str = ""  # redis / memory，为空时各进程独立累计
+    USAGE_FLUSH_INTERVAL_SECONDS: float = 5.0
+    USAGE_FLUSH_THRESHOLD: int = 500  # 累计次数达到该值时立即写入
+    
     # JWT配置
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7天 = 7 * 24 * 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # 刷新token 30天
     
+    # 认证用户缓存配置
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    
+    # 密码哈希配置
+    BCRYPT_ROUNDS: int = 12  # 修改后旧密码在下次登录时重新哈希
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # 超过时登录/注册返回503
+    
     # CORS配置
     BACKEND_CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
@@ -35,6 +76,56 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
     ]
     
+    # 搜索索引配置
+    SEARCH_INDEX_ENABLED: bool = True
+    SEARCH_INDEX_REFRESH_SECONDS: int = 60  # 同步其他进程写入的间隔
+    SEARCH_SQL_BATCH_SIZE: int = 500  # 按排序返回搜索结果时，每条语句的命中ID数量和扫描行数上限
+    
+    # 批量获取配置
+    PROMPT_BATCH_MAX_IDS: int = 200
+    
+    # 列表总数配置
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+    COUNT_ESTIMATE_THRESHOLD: int = 10000  # 估算模式下超过该数量时返回近似值（仅 PostgreSQL）
+    
+    # 变更订阅配置
+    CHANGE_FEED_SETTLE_SECONDS: int = 2  # 只返回早于该时长的变更，等待并发事务提交
+    
+    # 变更事件推送配置
+    EVENTS_BACKEND: str = ""  # redis：多进程部署时经 Redis pub/sub 转发
+    EVENTS_QUEUE_SIZE: int = 256  # 单个订阅者缓冲的事件数，超出时断开
+    EVENTS_REPLAY_SIZE: int = 1000  # 断线重连时可补发的最近事件数
+    EVENTS_KEEPALIVE_SECONDS: int = 15
+    
+    # 响应压缩配置
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # 小于该字节数的响应不压缩
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    PRECOMPRESSED_CACHE_MAX_ENTRIES: int = 512
+    PRECOMPRESSED_CACHE_TTL_SECONDS: int = 300
+    
+    # SQL 监控配置
+    SQL_ECHO: bool = False  # 打印全部语句，只在排查问题时开启
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN: bool = True  # 慢查询日志附带执行计划
+    N_PLUS_ONE_THRESHOLD: int = 10  # 同一请求中相同语句执行次数达到该值时告警
+    
+    # 运行指标配置
+    METRICS_ENABLED: bool = True
+    
+    # 性能分析配置
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""  # 请求头 X-Profile 携带该值时分析该请求，为空时不接受请求头触发
+    PROFILING_SAMPLE_RATE: float = 0.0  # 随机分析的请求比例
+    PROFILING_MODE: str = "sampling"  # sampling / cprofile，可通过请求头 X-Profile-Mode 指定
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_ENTRIES: int = 50  # 超出时删除最早的结果
+    PROFILING_ADMIN_USER_IDS: list[int] = []  # 可查看分析结果的用户ID（用户名可修改，不用于授权），为空时任何人都不能查看
+    
     # 文件上传配置
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -1,24 +1,249 @@
 """
 数据库连接和会话管理
 """
-from sqlalchemy import create_engine
+import time
+from typing import Optional, Union
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .cache import response_cache
 from .config import settings
+from .query_stats import instrument_engine
+from .replicas import Replica, ReplicaSet, request_user_id
 
-# 创建数据库引擎
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
+
+def is_sqlite_file(url: str) -> bool:
+    """是否为 SQLite 文件数据库（内存数据库各连接互不相通，不做读写分离）"""
+    parsed = make_url(url)
+    database = parsed.database or ""
+    return parsed.get_backend_name() == "sqlite" and database not in ("", ":memory:") \
+        and not database.startswith("file::memory:") and parsed.query.get("mode") != "memory"
+
+
+# SQLite 文件数据库：WAL 模式，读写使用独立的连接池，写入连接只有一个
+SQLITE_TUNED = settings.SQLITE_TUNING_ENABLED and is_sqlite_file(settings.DATABASE_URL)
+
+
+class CheckoutStatsMixin:
+    """记录借出连接的次数、耗时（排队等待和新建连接）和超时次数，供运行指标导出"""
+
+    checkouts = 0
+    checkout_seconds = 0.0
+    checkout_timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkouts += 1
+            self.checkout_seconds += time.perf_counter() - start
+
+
+class StatsQueuePool(CheckoutStatsMixin, QueuePool):
+    pass
+
+
+class StatsAsyncAdaptedQueuePool(CheckoutStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(role: str, is_async: bool = False) -> dict:
+    """
+    引擎参数
+    SQLite 写入连接池只有一个连接且不溢出，等待写入的请求在连接池中排队，
+    避免多个连接同时写入时出现 database is locked
+    """
+    poolclass = StatsAsyncAdaptedQueuePool if is_async else StatsQueuePool
+    if not SQLITE_TUNED:
+        options = {"pool_pre_ping": True, "echo": settings.SQL_ECHO}
+        # SQLite 使用方言默认的连接池（内存数据库不能使用队列连接池）
+        if make_url(settings.DATABASE_URL).get_backend_name() != "sqlite":
+            options["poolclass"] = poolclass
+        return options
+    options = {
+        "poolclass": poolclass,
+        "echo": settings.SQL_ECHO,
+    }
+    if role == "write":
+        options.update(pool_size=1, max_overflow=0, pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS)
+    else:
+        options.update(pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=settings.SQLITE_READ_POOL_SIZE)
+    return options
+
+
+def _sqlite_pragmas(read_only: bool):
+    """新连接建立时设置的 SQLite 参数"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            # 负数表示以 KiB 为单位
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _configure(sync_engine: Engine, role: str) -> None:
+    if SQLITE_TUNED and role in ("write", "read"):
+        event.listen(sync_engine, "connect", _sqlite_pragmas(read_only=role == "read"))
+    if settings.SQL_INSTRUMENTATION_ENABLED:
+        instrument_engine(sync_engine)
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+    写入语句以及同一事务中写入之后的语句使用主引擎；其他查询在只读作用域中使用只读副本，
+    否则使用只读引擎（SQLite 读连接池）或主引擎
+    """
+
+    def __init__(
+        self, *args, reader: Optional[Engine] = None, use_replicas: bool = False,
+        asynchronous: bool = False, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.reader = reader
+        self.use_replicas = use_replicas and replica_set.enabled
+        self.asynchronous = asynchronous
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        writer = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.info.get("wrote"):
+            return writer
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info["wrote"] = True
+            return writer
+        if self.use_replicas:
+            replica = self._replica_bind()
+            if replica is not None:
+                return replica
+        return self.reader or writer
+
+    @property
+    def read_replica(self) -> bool:
+        """查询是否使用了只读副本"""
+        return self._replica is not None
+
+    def _replica_bind(self) -> Optional[Engine]:
+        """会话内固定使用同一个副本；近期写入过的用户读取主库"""
+        if self._replica is None:
+            if replica_set.recently_wrote(request_user_id.get()):
+                self.use_replicas = False
+                return None
+            self._replica = replica_set.choose(self.asynchronous)
+        return self._replica
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_route(session: Session, transaction) -> None:
+    """事务结束后恢复读取路由（已提交的数据对只读连接可见），并记录写入的用户"""
+    if transaction.parent is None and session.info.pop("wrote", None):
+        replica_set.mark_write(request_user_id.get())
+
+
+# 创建数据库引擎（写入和未启用读写分离时的全部语句）
+engine = create_engine(settings.DATABASE_URL, **_engine_options("write"))
+_configure(engine, "write")
+
+# 只读引擎，未启用读写分离时与主引擎相同
+read_engine = engine
+if SQLITE_TUNED:
+    read_engine = create_engine(settings.DATABASE_URL, **_engine_options("read"))
+    _configure(read_engine, "read")
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine,
+    class_=RoutingSession, reader=read_engine if read_engine is not engine else None
+)
 
 # 创建模型基类
 Base = declarative_base()
 
+# 同步驱动到异步驱动的映射
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """将同步驱动的连接地址转换为对应的异步驱动"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def get_async_database_url() -> str:
+    """获取异步数据库连接地址，未配置时由 DATABASE_URL 推导"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return to_async_url(settings.DATABASE_URL)
+
+
+# 异步引擎和会话工厂（DATABASE_ASYNC 开启时创建）
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    async_engine = create_async_engine(get_async_database_url(), **_engine_options("write", is_async=True))
+    _configure(async_engine.sync_engine, "write")
+    async_read_engine = async_engine
+    if SQLITE_TUNED:
+        async_read_engine = create_async_engine(get_async_database_url(), **_engine_options("read", is_async=True))
+        _configure(async_read_engine.sync_engine, "read")
+    # 提交后不过期，响应序列化时不会在事件循环中触发加载
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False,
+        sync_session_class=RoutingSession, asynchronous=True,
+        reader=async_read_engine.sync_engine if async_read_engine is not async_engine else None
+    )
+
+
+def _create_replica(url: str) -> Replica:
+    replica = Replica(
+        make_url(url).render_as_string(hide_password=True),
+        create_engine(url, pool_pre_ping=True, echo=settings.SQL_ECHO)
+    )
+    _configure(replica.engine, "replica")
+    if settings.DATABASE_ASYNC:
+        replica.async_engine = create_async_engine(to_async_url(url), pool_pre_ping=True, echo=settings.SQL_ECHO)
+        _configure(replica.async_engine.sync_engine, "replica")
+    return replica
+
+
+# 只读副本，未配置时只读作用域同样使用主库；近期写入的用户记录在响应缓存的共享后端中
+replica_set = ReplicaSet(
+    [_create_replica(url) for url in settings.DATABASE_REPLICA_URLS], shared=response_cache.shared
+)
+
+
+async def dispose_async_engines() -> None:
+    """关闭异步引擎连接池中的连接（aiosqlite 每个连接占用一个非守护线程，不关闭时进程无法退出）"""
+    engines = {async_engine, async_read_engine} | {replica.async_engine for replica in replica_set.replicas}
+    for pool_engine in engines - {None}:
+        await pool_engine.dispose()
+
+
+# 端点使用的会话类型
+DBSession = Union[Session, AsyncSession]
+
 
 def get_db():
     """
@@ -29,4 +254,50 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_session():
+    """
+    数据库会话依赖（按配置返回异步或同步会话）
+    配合服务的异步版本使用
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+    
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def may_read_stale(db: DBSession) -> bool:
+    """
+    查询结果是否可能是旧数据：使用了只读副本，且副本可能尚未同步的时间窗口内有写入
+
+    此时结果不应写入共享的响应缓存，否则旧数据会以失效后的新版本号缓存一个完整周期。
+    """
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    if not getattr(session, "read_replica", False):
+        return False
+    return await response_cache.recently_invalidated()
+
+
+async def get_read_session():
+    """
+    只读端点的数据库会话依赖
+    配置了只读副本时查询使用副本；写入语句以及近期写入过的用户的请求仍使用主库
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal(use_replicas=True) as session:
+            yield session
+        return
+    
+    db = SessionLocal(use_replicas=True)
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,145 @@
+"""
+运行指标
+
+以 Prometheus 文本格式导出请求数、按路由的延迟直方图和正在处理的请求数，
+其他组件通过注册采集函数在导出时提供即时数值（连接池、缓存、哈希线程池等）。
+"""
+import bisect
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 采集函数返回 (指标名, 类型, 说明, [(标签, 数值), ...])
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+class MetricsRegistry:
+    """请求指标和采集函数的注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Counter = Counter()
+        self._latency: Dict[Tuple[str, str], list] = {}
+        self._collectors: List[Collector] = []
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, duration: float) -> None:
+        """记录一次请求"""
+        with self._lock:
+            self._requests[(method, route, str(status))] += 1
+            # 各桶只记录落入的数量，导出时再累加
+            entry = self._latency.get((method, route))
+            if entry is None:
+                entry = self._latency[(method, route)] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            entry[0][bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+            entry[1] += duration
+
+    def register(self, collector: Collector) -> None:
+        """注册导出时调用的采集函数"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式导出"""
+        with self._lock:
+            requests = dict(self._requests)
+            latency = {key: (list(buckets), total) for key, (buckets, total) in self._latency.items()}
+            in_flight = self.in_flight
+
+        lines = [
+            "# HELP http_requests_total 请求总数",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(_sample("http_requests_total", {"method": method, "route": route, "status": status}, count))
+
+        lines += [
+            "# HELP http_request_duration_seconds 请求处理时间",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), (buckets, total) in sorted(latency.items()):
+            labels = {"method": method, "route": route}
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(_sample("http_request_duration_seconds_bucket", {**labels, "le": le}, cumulative))
+            lines.append(_sample("http_request_duration_seconds_sum", labels, total))
+            lines.append(_sample("http_request_duration_seconds_count", labels, cumulative))
+
+        lines += [
+            "# HELP http_requests_in_flight 正在处理的请求数",
+            "# TYPE http_requests_in_flight gauge",
+            _sample("http_requests_in_flight", {}, in_flight),
+        ]
+
+        for collector in self._collectors:
+            for name, kind, description, samples in collector():
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+                lines += [_sample(name, labels, value) for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+def _sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+        return f"{name}{{{label_text}}} {value}"
+    return f"{name} {value}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsMiddleware:
+    """记录请求数、延迟和正在处理的请求数（纯 ASGI 实现）"""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        registry = self.registry
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with registry._lock:
+            registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            with registry._lock:
+                registry.in_flight -= 1
+            registry.observe(scope["method"], self._route(scope), status_code, duration)
+
+    def _route(self, scope) -> str:
+        """使用路由模板作为标签，避免路径参数造成标签数量膨胀"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(endpoint, "unmatched")
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
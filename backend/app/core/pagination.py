@@ -0,0 +1,69 @@
+"""
+游标分页工具
+"""
+import base64
+import json
+from typing import Any, List, Sequence
+from sqlalchemy import and_, literal, or_
+from sqlalchemy.sql import ClauseElement
+
+
+def encode_cursor(mode: str, values: Sequence[Any]) -> str:
+    """
+    生成不透明游标
+
+    Args:
+        mode: 游标对应的排序方式，解码时校验
+        values: 上一页最后一条记录的排序键
+
+    Returns:
+        URL安全的游标字符串
+    """
+    payload = json.dumps({"m": mode, "v": list(values)}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, mode: str, length: int) -> List[Any]:
+    """
+    解析游标
+
+    Args:
+        cursor: 游标字符串
+        mode: 期望的排序方式
+        length: 期望的排序键数量
+
+    Returns:
+        排序键列表
+
+    Raises:
+        ValueError: 游标无效或与排序方式不匹配
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+        cursor_mode = payload["m"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("无效的游标")
+    if cursor_mode != mode or not isinstance(values, list) or len(values) != length:
+        raise ValueError("游标与当前排序方式不匹配")
+    return values
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """
+    构造键集分页条件：降序时为 (c1, c2, ...) < (v1, v2, ...)，升序时为 >
+
+    展开为 OR/AND 形式以兼容不支持行值比较的数据库。排序键作为绑定参数传入，
+    布尔列也可以做大小比较；已是 SQL 表达式的值保持不变。
+    """
+    values = [
+        value if isinstance(value, ClauseElement) else literal(value, column.type)
+        for column, value in zip(columns, values)
+    ]
+    clauses = []
+    for index, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(index)]
+        after = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
@@ -0,0 +1,286 @@
+"""
+按需性能分析
+
+由授权请求头或采样率触发，对单个请求进行分析，结果写入磁盘上的环形缓冲目录，通过管理端点下载：
+- sampling：定时采集所有线程的调用栈（包括执行数据库操作的线程池），输出 speedscope JSON
+- cprofile：对事件循环线程进行确定性分析，输出 pstats 文件；线程池中执行的代码不在结果内
+同一进程同时只分析一个请求，其他请求照常处理。
+"""
+import cProfile
+import hmac
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import anyio
+import orjson
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILING_MODES = ("sampling", "cprofile")
+
+# 各模式结果文件的扩展名
+EXTENSIONS = {
+    "sampling": ".speedscope.json",
+    "cprofile": ".prof",
+}
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+# 线程池中空闲等待任务的线程，调用栈最内层位于这些模块
+_IDLE_MODULES = ("threading.py", "queue.py", os.path.join("futures", "thread.py"))
+
+
+class StackSampler:
+    """在后台线程中定时采集调用栈"""
+
+    def __init__(self, interval: float, loop_thread: int):
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.frames: List[Tuple[str, str, int]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = self.started
+        # 启动后立即采集一次，短于采样间隔的请求也有结果
+        while True:
+            now = time.perf_counter()
+            weight, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                # 事件循环线程的空闲时间（等待线程池或I/O）保留，其他线程只记录正在执行的
+                if thread_id != self.loop_thread and frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                self.samples.setdefault(thread_id, []).append((self._stack(frame), weight))
+            if self._stopped.wait(self.interval):
+                break
+
+    def _stack(self, frame) -> List[int]:
+        """调用栈的帧索引，从外层到内层"""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append(key)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def to_speedscope(self, name: str) -> bytes:
+        """导出为 speedscope 格式，每个线程一个 profile"""
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        profiles = []
+        for thread_id, samples in self.samples.items():
+            label = "事件循环" if thread_id == self.loop_thread else thread_names.get(thread_id, str(thread_id))
+            profiles.append({
+                "type": "sampled",
+                "name": label,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight for _, weight in samples],
+            })
+        return orjson.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.APP_NAME,
+            "shared": {
+                "frames": [{"name": func, "file": file, "line": line} for func, file, line in self.frames]
+            },
+            "profiles": profiles,
+        })
+
+
+class ProfileStore:
+    """分析结果目录，只保留最近的若干份"""
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def new_id(self) -> str:
+        return f"{int(time.time() * 1000)}-{secrets.token_hex(4)}"
+
+    def save(self, profile_id: str, mode: str, data: bytes, meta: dict) -> None:
+        """写入结果和元数据，超出数量时删除最早的"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile_id, EXTENSIONS[mode]), "wb") as f:
+            f.write(data)
+        with open(self._path(profile_id, ".meta.json"), "wb") as f:
+            f.write(orjson.dumps({"id": profile_id, "mode": mode, **meta}))
+        with self._lock:
+            for stale in self._ids()[:-self.max_entries]:
+                for extension in (*EXTENSIONS.values(), ".meta.json"):
+                    try:
+                        os.remove(self._path(stale, extension))
+                    except FileNotFoundError:
+                        pass
+
+    def list(self) -> List[dict]:
+        """最近的分析结果，新的在前"""
+        entries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, ".meta.json"), "rb") as f:
+                    entries.append(orjson.loads(f.read()))
+            except (FileNotFoundError, orjson.JSONDecodeError):
+                continue
+        return entries
+
+    def find(self, profile_id: str) -> Optional[Tuple[str, str]]:
+        """返回 (模式, 文件路径)，不存在时返回None"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        for mode, extension in EXTENSIONS.items():
+            path = self._path(profile_id, extension)
+            if os.path.exists(path):
+                return mode, path
+        return None
+
+    def _ids(self) -> List[str]:
+        """按时间排序的结果ID（ID以毫秒时间戳开头）"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".meta.json")] for name in names if name.endswith(".meta.json"))
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, profile_id + extension)
+
+
+def pstats_text(path: str, limit: int = 50) -> str:
+    """pstats 结果按累计时间排序的文本摘要"""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
+
+
+# 同一进程同时只分析一个请求
+_active = threading.Lock()
+
+
+class ProfilingMiddleware:
+    """按需分析单个请求，结果ID通过 X-Profile-Id 响应头返回（纯 ASGI 实现）"""
+
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.store = store or profile_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._requested_mode(scope)
+        if mode is None or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.store.new_id()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message["headers"], (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        try:
+            started = time.perf_counter()
+            if mode == "sampling":
+                profiler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000, threading.get_ident())
+                profiler.start()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    profiler.stop()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    profiler.disable()
+            duration = time.perf_counter() - started
+        finally:
+            _active.release()
+
+        path = scope["path"] + (f"?{scope['query_string'].decode('latin-1')}" if scope["query_string"] else "")
+        meta = {
+            "method": scope["method"],
+            "path": path,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        try:
+            await anyio.to_thread.run_sync(self._save, profile_id, mode, profiler, meta)
+        except Exception:
+            logger.exception("保存性能分析结果失败")
+
+    def _requested_mode(self, scope) -> Optional[str]:
+        """请求头携带正确令牌或命中采样率时返回分析模式"""
+        token = mode = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                token = value.decode("latin-1")
+            elif name == b"x-profile-mode":
+                mode = value.decode("latin-1")
+            elif name == b"accept" and b"text/event-stream" in value:
+                # 事件流长期不结束，不做分析
+                return None
+        if mode not in PROFILING_MODES:
+            mode = settings.PROFILING_MODE
+        if token is not None and settings.PROFILING_TOKEN \
+                and hmac.compare_digest(token, settings.PROFILING_TOKEN):
+            return mode
+        if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return settings.PROFILING_MODE
+        return None
+
+    def _save(self, profile_id: str, mode: str, profiler, meta: dict) -> None:
+        if mode == "sampling":
+            data = profiler.to_speedscope(f"{meta['method']} {meta['path']}")
+        else:
+            # 与 dump_stats 写出的文件格式相同
+            profiler.create_stats()
+            data = marshal.dumps(profiler.stats)
+        self.store.save(profile_id, mode, data, meta)
+
+
+# 全局分析结果目录
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_ENTRIES)
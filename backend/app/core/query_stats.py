@@ -0,0 +1,133 @@
+"""
+SQL 执行统计
+
+通过 SQLAlchemy 事件统计每个请求执行的语句数和数据库耗时，以 Server-Timing 响应头返回；
+记录超过阈值的慢查询（附带参数和执行计划），并对同一请求中重复执行的相同语句（N+1）告警。
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 执行计划的语句前缀
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+
+
+class QueryStats:
+    """单个请求的 SQL 执行统计"""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """执行次数达到阈值的语句"""
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+
+# 当前请求的统计，线程池和 run_sync 中执行的语句同样归入所在请求
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        _log_slow_query(conn, statement, parameters, duration, executemany)
+
+
+def _log_slow_query(conn, statement: str, parameters, duration: float, executemany: bool) -> None:
+    """记录慢查询，SELECT 语句附带执行计划"""
+    plan = None
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if settings.SLOW_QUERY_EXPLAIN and prefix and not executemany \
+            and statement.lstrip().upper().startswith("SELECT"):
+        plan = _explain(conn, prefix + statement, parameters)
+    logger.warning(
+        "慢查询 %.1fms: %s%s",
+        duration * 1000, statement,
+        f"\n执行计划:\n{plan}" if plan else ""
+    )
+    # 参数可能含密码哈希、令牌等敏感数据，只在 DEBUG 级别输出
+    logger.debug("慢查询参数: %.500r", parameters)
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """在同一连接上直接执行 EXPLAIN，不经过 SQLAlchemy 事件"""
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(statement, parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        logger.debug("获取执行计划失败: %s", e)
+        return None
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """为引擎注册统计事件"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """为每个请求收集 SQL 统计，写入 Server-Timing 响应头（纯 ASGI 实现）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+                    f"app;dur={total:.1f}"
+                )
+                message = {**message, "headers": [*message["headers"], (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            for statement, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "疑似 N+1 查询：%s %s 中同一语句执行了 %d 次: %s",
+                    scope["method"], scope["path"], count, statement
+                )
@@ -0,0 +1,190 @@
+"""
+只读副本
+
+只读端点的查询按轮询分配到健康的只读副本，分担主库的读取压力。后台线程定时检查副本的连接和复制延迟，
+查询时连接断开的副本立即标记为不可用；用户写入后的一段时间内，该用户的请求仍读取主库（读己之写）。
+配置共享缓存后端时近期写入的用户记录在共享后端中，用户的下一个请求落到其他工作进程时同样读取主库。
+"""
+import asyncio
+import itertools
+import logging
+import math
+import threading
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
+from .cache import LRUCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 当前请求的认证用户ID，由认证依赖设置
+request_user_id: ContextVar[Optional[int]] = ContextVar("request_user_id", default=None)
+
+# PostgreSQL 副本的复制延迟（秒），已回放到接收位置时视为没有延迟
+POSTGRES_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+# 记录近期写入用户的数量上限
+RECENT_WRITERS_MAX_ENTRIES = 100000
+
+# 共享后端中近期写入用户的键前缀
+RECENT_WRITER_KEY = "replicas:wrote:"
+
+
+class Replica:
+    """一个只读副本的同步和异步引擎"""
+
+    __slots__ = ("name", "engine", "async_engine", "healthy")
+
+    def __init__(self, name: str, engine: Engine, async_engine: Optional[AsyncEngine] = None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = True
+
+
+class ReplicaSet:
+    """只读副本集合"""
+
+    def __init__(self, replicas: List[Replica], shared=None):
+        self.replicas = replicas
+        self.shared = shared
+        self._counter = itertools.count()
+        self._recent_writers = LRUCache(RECENT_WRITERS_MAX_ENTRIES)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for replica in replicas:
+            engines = [replica.engine]
+            if replica.async_engine is not None:
+                engines.append(replica.async_engine.sync_engine)
+            for replica_engine in engines:
+                event.listen(replica_engine, "handle_error", self._error_handler(replica))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, asynchronous: bool = False) -> Optional[Engine]:
+        """轮询选择健康的副本，没有可用副本时返回None（使用主库）"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        replica = healthy[next(self._counter) % len(healthy)]
+        if asynchronous:
+            return replica.async_engine.sync_engine if replica.async_engine is not None else None
+        return replica.engine
+
+    def mark_write(self, user_id: Optional[int]) -> None:
+        """
+        记录用户写入，之后一段时间内该用户的读取使用主库
+
+        异步会话通过 run_sync 在事件循环线程中提交，此时共享后端的写入在线程池中执行。
+        """
+        if user_id is None or not self.replicas:
+            return
+        self._recent_writers.set(user_id, True, settings.READ_YOUR_WRITES_SECONDS)
+        if self.shared is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._mark_shared(user_id)
+            return
+        try:
+            await_only(run_in_threadpool(self._mark_shared, user_id))
+        except MissingGreenlet:
+            loop.run_in_executor(None, self._mark_shared, user_id)
+
+    def _mark_shared(self, user_id: int) -> None:
+        try:
+            self.shared.set(
+                f"{RECENT_WRITER_KEY}{user_id}", b"1", ex=math.ceil(settings.READ_YOUR_WRITES_SECONDS)
+            )
+        except Exception as e:
+            logger.warning("记录近期写入用户失败: %s", e)
+
+    def recently_wrote(self, user_id: Optional[int]) -> bool:
+        """用户近期是否写入过（包括在其他工作进程中的写入）"""
+        if user_id is None:
+            return False
+        if self._recent_writers.get(user_id) is not None:
+            return True
+        if self.shared is None:
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self._recently_wrote_shared(user_id)
+        try:
+            return await_only(run_in_threadpool(self._recently_wrote_shared, user_id))
+        except MissingGreenlet:
+            return self._recently_wrote_shared(user_id)
+
+    def _recently_wrote_shared(self, user_id: int) -> bool:
+        try:
+            return bool(self.shared.exists(f"{RECENT_WRITER_KEY}{user_id}"))
+        except Exception as e:
+            # 无法确认时读取主库
+            logger.warning("读取近期写入用户失败: %s", e)
+            return True
+
+    def check(self) -> None:
+        """检查所有副本，更新可用状态"""
+        for replica in self.replicas:
+            healthy = self._probe(replica)
+            if healthy != replica.healthy:
+                if healthy:
+                    logger.info("只读副本 %s 已恢复", replica.name)
+                else:
+                    logger.warning("只读副本 %s 不可用，读取改用其他副本或主库", replica.name)
+            replica.healthy = healthy
+
+    @staticmethod
+    def _probe(replica: Replica) -> bool:
+        try:
+            with replica.engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+                if settings.REPLICA_MAX_LAG_SECONDS > 0 and conn.dialect.name == "postgresql":
+                    lag = conn.exec_driver_sql(POSTGRES_LAG_SQL).scalar()
+                    if lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS:
+                        logger.warning("只读副本 %s 复制延迟 %.1f 秒", replica.name, lag)
+                        return False
+        except Exception as e:
+            logger.warning("只读副本 %s 检查失败: %s", replica.name, e)
+            return False
+        return True
+
+    @staticmethod
+    def _error_handler(replica: Replica):
+        def handle_error(context) -> None:
+            # 连接断开时立即停用，由后台检查恢复
+            if context.is_disconnect:
+                replica.healthy = False
+        return handle_error
+
+    def _run(self) -> None:
+        while not self._stopping.wait(settings.REPLICA_HEALTH_CHECK_SECONDS):
+            self.check()
+
+    def start(self) -> None:
+        """启动后台检查线程"""
+        if not self.replicas or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台检查线程"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
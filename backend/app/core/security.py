@@ -1,14 +1,20 @@
 """
 安全认证相关功能
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Tuple, Union
 from jose import jwt
 from passlib.context import CryptContext
 from .config import settings
 
-# 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码加密上下文（轮数变化后，旧哈希在登录时自动升级）
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def create_access_token(
@@ -62,4 +68,72 @@ def get_password_hash(password: str) -> str:
     Returns:
         哈希密码
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password) 
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，并在哈希参数过期时生成新哈希
+    
+    Args:
+        plain_password: 明文密码
+        hashed_password: 哈希密码
+        
+    Returns:
+        (验证结果, 需要保存的新哈希；无需升级时为None)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """密码哈希队列已满"""
+    pass
+
+
+class PasswordHasher:
+    """
+    密码哈希线程池
+
+    bcrypt 计算期间释放 GIL，放到独立线程池执行，不阻塞事件循环；
+    排队数量超过上限时直接拒绝，避免登录高峰拖垮其他请求。
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.depth = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func, *args):
+        if self.depth >= self.max_workers + self.max_queue:
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hasher"
+            )
+        self.depth += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.depth -= 1
+
+    async def hash(self, password: str) -> str:
+        """获取密码哈希值"""
+        return await self._run(get_password_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """验证密码，并在需要时返回升级后的哈希"""
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# 全局密码哈希线程池
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
@@ -1,10 +1,101 @@
 """
 FastAPI主应用
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from .core.cache import response_cache, precompressed_cache
+from .core.compression import CompressionMiddleware
 from .core.config import settings
+from .core.database import (
+    engine, read_engine, async_engine, async_read_engine, replica_set, dispose_async_engines,
+    CheckoutStatsMixin
+)
+from .core.metrics import MetricsMiddleware, metrics
+from .core.profiling import ProfilingMiddleware
+from .core.query_stats import QueryStatsMiddleware
+from .core.security import password_hasher
 from .api.v1.api import api_router
+from .services.count_cache import count_cache
+from .services.event_broadcaster import event_broadcaster
+from .services.principal_cache import principal_cache
+from .services.search_index import search_index
+from .services.usage_counter import usage_counter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动后台任务，关闭时写入缓冲的数据"""
+    usage_counter.start()
+    event_broadcaster.start()
+    replica_set.start()
+    search_index.start()
+    yield
+    search_index.stop()
+    replica_set.stop()
+    event_broadcaster.stop()
+    usage_counter.stop()
+    password_hasher.shutdown()
+    await dispose_async_engines()
+
+
+def collect_runtime_metrics():
+    """导出时采集连接池、缓存、密码哈希线程池等组件的即时数值"""
+    pools = [("sync", engine.pool)]
+    if read_engine is not engine:
+        pools.append(("sync_read", read_engine.pool))
+    if async_engine is not None:
+        pools.append(("async", async_engine.sync_engine.pool))
+    if async_read_engine is not async_engine:
+        pools.append(("async_read", async_read_engine.sync_engine.pool))
+    pool_stats = {key: [] for key in ("size", "checked_out", "overflow", "checkouts", "checkout_seconds", "timeouts")}
+    for name, pool in pools:
+        # NullPool（如 aiosqlite）等连接池不提供这些统计
+        if not hasattr(pool, "checkedout"):
+            continue
+        pool_stats["size"].append(({"engine": name}, pool.size()))
+        pool_stats["checked_out"].append(({"engine": name}, pool.checkedout()))
+        pool_stats["overflow"].append(({"engine": name}, pool.overflow()))
+        if isinstance(pool, CheckoutStatsMixin):
+            pool_stats["checkouts"].append(({"engine": name}, pool.checkouts))
+            pool_stats["checkout_seconds"].append(({"engine": name}, pool.checkout_seconds))
+            pool_stats["timeouts"].append(({"engine": name}, pool.checkout_timeouts))
+    yield "db_pool_size", "gauge", "连接池大小", pool_stats["size"]
+    yield "db_pool_checked_out", "gauge", "已借出的连接数", pool_stats["checked_out"]
+    yield "db_pool_overflow", "gauge", "超出连接池大小的连接数（为正时新的借出需要等待或溢出）", pool_stats["overflow"]
+    yield "db_pool_checkouts_total", "counter", "从连接池借出连接的次数", pool_stats["checkouts"]
+    yield "db_pool_checkout_seconds_total", "counter", \
+        "借出连接的累计耗时（排队等待和新建连接），除以借出次数为平均等待时间", pool_stats["checkout_seconds"]
+    yield "db_pool_checkout_timeouts_total", "counter", "等待连接超时的次数", pool_stats["timeouts"]
+
+    hits = [({"cache": f"response:{ns}"}, count) for ns, count in sorted(response_cache.hits.items())]
+    misses = [({"cache": f"response:{ns}"}, count) for ns, count in sorted(response_cache.misses.items())]
+    for name, cache in (
+        ("principal", principal_cache),
+        ("count", count_cache),
+        ("precompressed", precompressed_cache),
+    ):
+        hits.append(({"cache": name}, cache.hits))
+        misses.append(({"cache": name}, cache.misses))
+    yield "cache_hits_total", "counter", "缓存命中次数", hits
+    yield "cache_misses_total", "counter", "缓存未命中次数", misses
+
+    yield "password_hash_in_progress", "gauge", "正在执行和排队的密码哈希数", [({}, password_hasher.depth)]
+    yield "password_hash_queue_depth", "gauge", "排队等待的密码哈希数", [
+        ({}, max(0, password_hasher.depth - password_hasher.max_workers))
+    ]
+    yield "usage_counter_pending", "gauge", "尚未写入数据库的使用次数", [
+        ({}, sum(usage_counter.pending().values()))
+    ]
+    yield "event_subscribers", "gauge", "本进程的事件订阅者数量", [({}, event_broadcaster.subscriber_count())]
+    yield "db_replica_healthy", "gauge", "只读副本是否可用", [
+        ({"replica": replica.name}, int(replica.healthy)) for replica in replica_set.replicas
+    ]
+
+
+metrics.register(collect_runtime_metrics)
+
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -12,7 +103,9 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="一个现代化的提示词管理平台API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # 配置CORS中间件
@@ -24,6 +117,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 配置响应压缩中间件
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# 配置 SQL 统计中间件
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
+# 配置请求指标中间件
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 配置按需性能分析中间件（最外层，分析范围包括其他中间件）
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # 注册API路由
 app.include_router(api_router, prefix="/api/v1")
 
@@ -41,4 +150,12 @@ async def root():
 @app.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus 指标"""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
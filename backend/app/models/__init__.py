@@ -3,5 +3,6 @@ from .user import User
 from .category import Category
 from .prompt import Prompt
 from .rating import Rating
+from .prompt_tombstone import PromptTombstone
 
-__all__ = ["User", "Category", "Prompt", "Rating"] 
\ No newline at end of file
+__all__ = ["User", "Category", "Prompt", "Rating", "PromptTombstone"] 
\ No newline at end of file
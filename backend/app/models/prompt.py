@@ -1,7 +1,7 @@
 """
 提示词数据模型
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Float, Index, text, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -10,6 +10,24 @@ from ..core.database import Base
 class Prompt(Base):
     """提示词模型"""
     __tablename__ = "prompts"
+    __table_args__ = (
+        # 列表排序索引：以可见性为前缀，各排序方式均为索引范围扫描
+        Index("ix_prompts_public_newest", "is_public", "id"),
+        Index("ix_prompts_public_usage", "is_public", "usage_count", "id"),
+        Index("ix_prompts_public_rating", "is_public", "rating_avg", "rating_count", "id"),
+        Index("ix_prompts_public_featured", "is_public", "is_featured", "id"),
+        Index("ix_prompts_category_public_newest", "category_id", "is_public", "id"),
+        # 精选筛选：精选且公开的提示词很少，部分索引只包含这些行
+        Index(
+            "ix_prompts_featured_newest", "id",
+            postgresql_where=text("is_featured AND is_public"),
+            sqlite_where=text("is_featured = 1 AND is_public = 1"),
+        ),
+        # 登录用户可见自己的非公开提示词，以及按作者查询
+        Index("ix_prompts_author_newest", "author_id", "id"),
+        # 变更订阅按更新时间顺序读取
+        Index("ix_prompts_public_updated", "is_public", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -35,14 +53,15 @@ class Prompt(Base):
     use_cases = Column(JSON, comment="使用场景")
     
     # 状态信息
-    is_public = Column(Boolean, default=False, comment="是否公开")
-    is_featured = Column(Boolean, default=False, comment="是否精选")
+    # 排序和筛选列不允许为空，键集分页的比较依赖于此
+    is_public = Column(Boolean, default=False, nullable=False, server_default=false(), comment="是否公开")
+    is_featured = Column(Boolean, default=False, nullable=False, server_default=false(), comment="是否精选")
     status = Column(String(20), default="draft", comment="状态：draft/published/archived")
     
     # 评价信息
-    rating_avg = Column(Float, default=0.0, comment="平均评分")
-    rating_count = Column(Integer, default=0, comment="评分数量")
-    usage_count = Column(Integer, default=0, comment="使用次数")
+    rating_avg = Column(Float, default=0.0, nullable=False, server_default="0", comment="平均评分")
+    rating_count = Column(Integer, default=0, nullable=False, server_default="0", comment="评分数量")
+    usage_count = Column(Integer, default=0, nullable=False, server_default="0", comment="使用次数")
     
     # 关联信息
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="作者ID")
@@ -0,0 +1,24 @@
+"""
+提示词删除记录数据模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class PromptTombstone(Base):
+    """提示词删除记录：删除或取消公开时写入，供变更订阅同步删除"""
+    __tablename__ = "prompt_tombstones"
+    __table_args__ = (
+        Index("ix_prompt_tombstones_created", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_id = Column(Integer, nullable=False, index=True, comment="提示词ID")
+    reason = Column(String(20), nullable=False, comment="原因：deleted/hidden")
+    
+    # 时间戳
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="记录时间")
+
+    def __repr__(self):
+        return f"<PromptTombstone(prompt_id={self.prompt_id}, reason='{self.reason}')>"
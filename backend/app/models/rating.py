@@ -1,7 +1,7 @@
 """
 评分数据模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -10,6 +10,12 @@ from ..core.database import Base
 class Rating(Base):
     """评分模型"""
     __tablename__ = "ratings"
+    __table_args__ = (
+        # 按提示词汇总评分（包含 score，汇总时不回表）
+        Index("ix_ratings_prompt_score", "prompt_id", "score"),
+        # 用户的评分，以及用户是否已评价某提示词
+        Index("ix_ratings_user_prompt", "user_id", "prompt_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False, comment="提示词ID")
@@ -2,7 +2,8 @@
 提示词相关的数据模式
 """
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Optional, List, Sequence, Tuple
+import orjson
 from pydantic import BaseModel
 
 
@@ -77,7 +78,187 @@ class PromptInDB(PromptInDBBase):
 class PromptList(BaseModel):
     """提示词列表响应模式"""
     items: List[Prompt]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_estimated: bool = False
+    page: Optional[int] = None
     size: int
-    pages: int 
\ No newline at end of file
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None 
+
+
+class PromptBatchRequest(BaseModel):
+    """批量获取提示词请求模式"""
+    ids: List[int]
+    fields: Optional[List[str]] = None
+    expand: Optional[List[str]] = None
+
+
+class PromptBatch(BaseModel):
+    """批量获取提示词响应模式"""
+    items: List[Prompt]
+    missing: List[int] = []
+
+
+class PromptChange(BaseModel):
+    """提示词变更：upsert 携带最新内容，delete 表示已删除或不再公开"""
+    op: str
+    id: int
+    changed_at: datetime
+    reason: Optional[str] = None
+    prompt: Optional[Prompt] = None
+
+
+class PromptChangeFeed(BaseModel):
+    """提示词变更批次"""
+    changes: List[PromptChange]
+    next_cursor: str
+    has_more: bool
+
+
+# 列表摘要视图包含的字段（不含正文、示例等大字段）
+SUMMARY_FIELDS = (
+    "id", "name_zh", "name_en", "description", "category_id", "tags",
+    "is_public", "is_featured", "status", "rating_avg", "rating_count",
+    "usage_count", "author_id", "created_at", "updated_at",
+)
+
+
+class PromptSummary(BaseModel):
+    """提示词摘要模式（仅用于文档，实际响应由 PromptRowPage 直接序列化）"""
+    id: int
+    name_zh: str
+    name_en: Optional[str] = None
+    description: Optional[str] = None
+    category_id: int
+    tags: Optional[List[str]] = []
+    is_public: bool
+    is_featured: bool
+    status: str
+    rating_avg: float
+    rating_count: int
+    usage_count: int
+    author_id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+# 可通过 fields 参数选择的字段
+PROMPT_FIELDS = tuple(Prompt.model_fields)
+
+
+class PromptAuthor(BaseModel):
+    """展开的作者摘要"""
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+
+class PromptCategoryRef(BaseModel):
+    """展开的分类摘要"""
+    id: int
+    name: str
+    icon: Optional[str] = None
+
+
+# 可通过 expand 参数展开的关联，以及展开后包含的字段
+EXPAND_FIELDS = {
+    "author": tuple(PromptAuthor.model_fields),
+    "category": tuple(PromptCategoryRef.model_fields),
+}
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    """
+    解析逗号分隔的字段列表
+
+    Raises:
+        ValueError: 包含未知字段或为空
+    """
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise ValueError("fields 不能为空")
+    unknown = [name for name in names if name not in PROMPT_FIELDS]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    return names
+
+
+def parse_expand(expand: str) -> Tuple[str, ...]:
+    """
+    解析逗号分隔的展开关联列表
+
+    Raises:
+        ValueError: 包含未知关联
+    """
+    names = tuple(dict.fromkeys(name.strip() for name in expand.split(",") if name.strip()))
+    unknown = [name for name in names if name not in EXPAND_FIELDS]
+    if unknown:
+        raise ValueError(f"无法展开: {', '.join(unknown)}")
+    return names
+
+
+def dump_json(payload: Any) -> bytes:
+    """序列化为紧凑的 JSON"""
+    return orjson.dumps(payload)
+
+
+def row_to_dict(row: Any, fields: Sequence[str], expansions: Optional[dict] = None) -> dict:
+    """
+    按字段取出数据库行中的值
+
+    Args:
+        expansions: 关联名到 {ID: 摘要} 的映射，按行中的 <关联>_id 嵌入
+    """
+    data = {field: getattr(row, field) for field in fields}
+    if expansions:
+        for relation, values in expansions.items():
+            data[relation] = values.get(getattr(row, f"{relation}_id"))
+    return data
+
+
+class PromptRowPage:
+    """
+    按字段投影的提示词列表（摘要视图和 fields 参数）
+
+    items 为只包含所需列的数据库行（元组），
+    不创建 ORM 实例也不经过 pydantic 校验，直接序列化为 JSON。
+    """
+    __slots__ = (
+        "items", "fields", "expansions", "total", "total_estimated",
+        "page", "size", "pages", "next_cursor",
+    )
+
+    def __init__(
+        self,
+        items: Sequence[tuple],
+        fields: Sequence[str],
+        total: Optional[int],
+        size: int,
+        total_estimated: bool = False,
+        page: Optional[int] = None,
+        pages: Optional[int] = None,
+        next_cursor: Optional[str] = None,
+        expansions: Optional[dict] = None,
+    ):
+        self.items = items
+        self.fields = fields
+        self.expansions = expansions
+        self.total = total
+        self.total_estimated = total_estimated
+        self.page = page
+        self.size = size
+        self.pages = pages
+        self.next_cursor = next_cursor
+
+    def to_json(self) -> bytes:
+        """序列化为与 PromptList 结构一致的 JSON"""
+        return dump_json({
+            "items": [row_to_dict(row, self.fields, self.expansions) for row in self.items],
+            "total": self.total,
+            "total_estimated": self.total_estimated,
+            "page": self.page,
+            "size": self.size,
+            "pages": self.pages,
+            "next_cursor": self.next_cursor,
+        })
@@ -0,0 +1,42 @@
+"""
+服务基类
+"""
+from typing import Any, Optional, Type
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..core.database import DBSession
+
+
+class AsyncServiceWrapper:
+    """
+    同步服务的异步版本基类
+
+    使用 AsyncSession 时通过 run_sync 在异步驱动上执行同步服务代码，
+    使用同步 Session 时在线程池中执行，两种方式都不阻塞事件循环。
+    """
+    service_class: type
+
+    def __init__(self, db: DBSession):
+        self.db = db
+
+    async def _call(self, method: str, *args: Any, schema: Optional[Type[BaseModel]] = None, **kwargs: Any) -> Any:
+        """
+        调用同步服务方法
+
+        Args:
+            method: 方法名
+            schema: 在会话上下文中将结果转换为该模式，用于需要加载关联关系的结果
+        """
+        def call(session: Session) -> Any:
+            result = getattr(self.service_class(session), method)(*args, **kwargs)
+            if schema is None or result is None:
+                return result
+            if isinstance(result, list):
+                return [schema.model_validate(item) for item in result]
+            return schema.model_validate(result)
+
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(call)
+        return await run_in_threadpool(call, self.db)
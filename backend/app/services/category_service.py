@@ -1,11 +1,52 @@
 """
 分类服务
 """
-from typing import Optional, List
+import threading
+import time
+from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
+from ..core.cache import response_cache
+from ..core.config import settings
 from ..models.category import Category
 from ..models.prompt import Prompt
-from ..schemas.category import CategoryCreate, CategoryUpdate
+from ..schemas.category import Category as CategorySchema, CategoryCreate, CategoryUpdate, CategoryInDB
+from .base import AsyncServiceWrapper
+from .event_broadcaster import event_broadcaster
+
+
+class CategoryTreeCache:
+    """分类树缓存，分类写入时递增版本号使其失效"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._trees: Dict[bool, tuple] = {}
+
+    def get(self, include_inactive: bool) -> Optional[List[Dict[str, Any]]]:
+        """获取当前版本且未过期的分类树"""
+        entry = self._trees.get(include_inactive)
+        if entry is None:
+            return None
+        version, built_at, tree = entry
+        if version != self.version or time.monotonic() - built_at >= settings.CACHE_TTL_CATEGORIES:
+            return None
+        return tree
+
+    def set(self, include_inactive: bool, version: int, tree: List[Dict[str, Any]]) -> None:
+        """保存构建时的版本对应的分类树"""
+        with self._lock:
+            if version == self.version:
+                self._trees[include_inactive] = (version, time.monotonic(), tree)
+
+    def bump(self) -> None:
+        """递增版本号"""
+        with self._lock:
+            self.version += 1
+            self._trees.clear()
+
+
+# 全局分类树缓存实例
+category_tree_cache = CategoryTreeCache()
 
 
 class CategoryService:
@@ -30,10 +71,51 @@ class CategoryService:
         
         return query.order_by(Category.sort_order, Category.name).all()
 
-    def get_tree(self, include_inactive: bool = False) -> List[Category]:
-        """获取分类树"""
-        # 简化实现：只返回顶级分类
-        return self.get_list(parent_id=None, include_inactive=include_inactive)
+    def get_tree(self, include_inactive: bool = False) -> List[Dict[str, Any]]:
+        """
+        获取分类树
+
+        一次查询加载全部分类并在内存中组装层级，结果按版本号缓存。
+        返回的结构为共享缓存，调用方不应修改。
+        """
+        tree = category_tree_cache.get(include_inactive)
+        if tree is not None:
+            return tree
+        
+        version = category_tree_cache.version
+        tree = self._build_tree(include_inactive)
+        category_tree_cache.set(include_inactive, version, tree)
+        return tree
+
+    def _build_tree(self, include_inactive: bool) -> List[Dict[str, Any]]:
+        """从全部分类组装分类树，未启用的分类及其子树在不包含时被剔除"""
+        categories = self.db.query(Category).order_by(Category.sort_order, Category.name).all()
+        
+        nodes = {}
+        for category in categories:
+            nodes[category.id] = {
+                "id": category.id,
+                "name": category.name,
+                "description": category.description,
+                "parent_id": category.parent_id,
+                "sort_order": category.sort_order,
+                "icon": category.icon,
+                "is_active": category.is_active,
+                "children": [],
+            }
+        
+        roots = []
+        for category in categories:
+            node = nodes[category.id]
+            if not include_inactive and not category.is_active:
+                continue
+            if category.parent_id is None:
+                roots.append(node)
+            elif category.parent_id in nodes:
+                # 未启用的父分类不在树中，挂在其下的子分类随之不可达
+                nodes[category.parent_id]["children"].append(node)
+        
+        return roots
 
     def create(self, category_create: CategoryCreate) -> Category:
         """创建分类"""
@@ -41,6 +123,9 @@ class CategoryService:
         self.db.add(db_category)
         self.db.commit()
         self.db.refresh(db_category)
+        category_tree_cache.bump()
+        response_cache.invalidate("categories")
+        self._publish("category.created", db_category)
         return db_category
 
     def update(self, category_id: int, category_update: CategoryUpdate) -> Optional[Category]:
@@ -55,6 +140,9 @@ class CategoryService:
         
         self.db.commit()
         self.db.refresh(db_category)
+        category_tree_cache.bump()
+        response_cache.invalidate("categories")
+        self._publish("category.updated", db_category)
         return db_category
 
     def delete(self, category_id: int) -> bool:
@@ -65,8 +153,16 @@ class CategoryService:
         
         self.db.delete(db_category)
         self.db.commit()
+        category_tree_cache.bump()
+        response_cache.invalidate("categories")
+        event_broadcaster.publish("category.deleted", {"id": category_id})
         return True
 
+    @staticmethod
+    def _publish(event_type: str, db_category: Category) -> None:
+        """发布分类变更事件（不含子分类）"""
+        event_broadcaster.publish(event_type, CategoryInDB.model_validate(db_category).model_dump(mode="json"))
+
     def has_children(self, category_id: int) -> bool:
         """检查是否有子分类"""
         count = self.db.query(Category).filter(Category.parent_id == category_id).count()
@@ -74,5 +170,39 @@ class CategoryService:
 
     def has_prompts(self, category_id: int) -> bool:
         """检查是否有关联的提示词"""
-        count = self.db.query(Prompt).filter(Prompt.category_id == category_id).count()
-        return count > 0 
\ No newline at end of file
+        return self.db.query(Prompt.id).filter(Prompt.category_id == category_id).first() is not None
+
+
+class AsyncCategoryService(AsyncServiceWrapper):
+    """
+    分类服务（异步版本）
+
+    返回的分类在会话上下文中转换为响应模式，避免在事件循环中懒加载子分类。
+    """
+    service_class = CategoryService
+
+    async def get(self, category_id: int) -> Optional[CategorySchema]:
+        return await self._call("get", category_id, schema=CategorySchema)
+
+    async def get_list(self, parent_id: Optional[int] = None, include_inactive: bool = False) -> List[CategorySchema]:
+        return await self._call(
+            "get_list", parent_id=parent_id, include_inactive=include_inactive, schema=CategorySchema
+        )
+
+    async def get_tree(self, include_inactive: bool = False) -> List[Dict[str, Any]]:
+        return await self._call("get_tree", include_inactive=include_inactive)
+
+    async def create(self, category_create: CategoryCreate) -> CategorySchema:
+        return await self._call("create", category_create, schema=CategorySchema)
+
+    async def update(self, category_id: int, category_update: CategoryUpdate) -> Optional[CategorySchema]:
+        return await self._call("update", category_id, category_update, schema=CategorySchema)
+
+    async def delete(self, category_id: int) -> bool:
+        return await self._call("delete", category_id)
+
+    async def has_children(self, category_id: int) -> bool:
+        return await self._call("has_children", category_id)
+
+    async def has_prompts(self, category_id: int) -> bool:
+        return await self._call("has_prompts", category_id)
@@ -0,0 +1,28 @@
+"""
+列表总数缓存
+
+按规范化后的筛选条件缓存列表总数，提示词写入时整体失效；
+过期时间用于兜底其他进程的写入。
+"""
+from typing import Any, Hashable
+from ..core.cache import LRUCache
+from ..core.config import settings
+
+
+class CountCache(LRUCache):
+    """总数缓存，使用统一的过期时间"""
+
+    def __init__(self):
+        super().__init__(settings.COUNT_CACHE_MAX_ENTRIES)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """写入缓存"""
+        super().set(key, value, settings.COUNT_CACHE_TTL_SECONDS)
+
+    def invalidate(self) -> None:
+        """清空缓存"""
+        self.clear()
+
+
+# 全局总数缓存实例
+count_cache = CountCache()
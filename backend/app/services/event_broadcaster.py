@@ -0,0 +1,189 @@
+"""
+变更事件广播
+
+服务在提交后发布事件，由广播器扇出到本进程的 SSE 订阅者；配置 Redis 后事件经
+pub/sub 转发，所有工作进程（包括发布者自身）都从频道接收，订阅者只会收到一次。
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
+from ..core.cache import create_shared_backend
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis 中的事件频道和全局事件ID序列
+CHANNEL = "events"
+SEQUENCE_KEY = "events:sequence"
+
+
+class Subscription:
+    """单个订阅者：绑定到所在事件循环的有界队列"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, topics: Iterable[str]):
+        self.loop = loop
+        self.topics = frozenset(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+
+    def deliver(self, event: Optional[dict]) -> None:
+        """在订阅者的事件循环中投递事件，None 表示结束订阅"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 消费过慢：丢弃积压并结束订阅，客户端重连后通过变更订阅补齐
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventBroadcaster:
+    """进程内事件广播器，可选 Redis pub/sub 作为多进程转发"""
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._subscribers: set = set()
+        self._recent: deque = deque(maxlen=settings.EVENTS_REPLAY_SIZE)
+        # 本地事件ID从启动时刻的毫秒数开始，进程重启后客户端携带的旧ID可被识别为过期
+        self._first_id = 0 if shared is not None else int(time.time() * 1000)
+        self._ids = itertools.count(self._first_id)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        发布事件，可在任意线程中调用
+
+        异步会话通过 run_sync 在事件循环线程中执行服务，此时 Redis 调用在线程池中执行，
+        服务代码等待其完成（保持事件顺序），事件循环继续处理其他请求。
+
+        Args:
+            event_type: 事件类型，如 prompt.updated；点号前为订阅主题
+            data: 可 JSON 序列化的事件数据
+        """
+        if self.shared is None:
+            self._dispatch({"id": next(self._ids), "type": event_type, "data": data})
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._publish_shared(event_type, data)
+            return
+        try:
+            await_only(run_in_threadpool(self._publish_shared, event_type, data))
+        except MissingGreenlet:
+            loop.run_in_executor(None, self._publish_shared, event_type, data)
+
+    def _publish_shared(self, event_type: str, data: Dict[str, Any]) -> None:
+        """经 Redis 发布事件，失败时仅在本进程广播"""
+        try:
+            event_id = self.shared.incr(SEQUENCE_KEY)
+            self.shared.publish(CHANNEL, json.dumps(
+                {"id": event_id, "type": event_type, "data": data}, ensure_ascii=False
+            ))
+        except Exception as e:
+            logger.warning("发布事件到Redis失败，仅在本进程广播: %s", e)
+            self._dispatch({"id": next(self._ids), "type": event_type, "data": data})
+
+    def subscribe(
+        self, topics: Iterable[str], last_event_id: Optional[int] = None
+    ) -> Tuple[Subscription, Optional[List[dict]]]:
+        """
+        在当前事件循环中订阅
+
+        Args:
+            topics: 订阅的主题
+            last_event_id: 客户端最后收到的事件ID，用于断线重连后补发
+
+        Returns:
+            (订阅者, 需补发的事件)；补发范围已超出缓冲时事件为 None，客户端需要重新同步
+        """
+        subscription = Subscription(asyncio.get_running_loop(), topics)
+        with self._lock:
+            # 注册与读取缓冲在同一把锁内，补发和实时事件之间不会重复或遗漏
+            self._subscribers.add(subscription)
+            if last_event_id is None:
+                return subscription, []
+            oldest = self._recent[0]["id"] if self._recent else self._first_id
+            if oldest > last_event_id + 1:
+                return subscription, None
+            replay = [
+                event for event in self._recent
+                if event["id"] > last_event_id and _topic(event) in subscription.topics
+            ]
+        return subscription, replay
+
+    def subscriber_count(self) -> int:
+        """本进程当前的订阅者数量"""
+        return len(self._subscribers)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _dispatch(self, event: dict) -> None:
+        """把事件投递给本进程中订阅了该主题的订阅者"""
+        topic = _topic(event)
+        with self._lock:
+            self._recent.append(event)
+            subscribers = [sub for sub in self._subscribers if topic in sub.topics]
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(subscription)
+
+    def start(self) -> None:
+        """使用 Redis 时启动频道监听线程"""
+        if self.shared is None or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="event-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止监听线程"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                pubsub = self.shared.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                while not self._stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._dispatch(json.loads(message["data"]))
+                pubsub.close()
+            except Exception as e:
+                logger.warning("监听事件频道失败，稍后重试: %s", e)
+                time.sleep(1.0)
+
+
+def _topic(event: dict) -> str:
+    return event["type"].split(".", 1)[0]
+
+
+def _create_backend():
+    if not settings.EVENTS_BACKEND:
+        return None
+    if settings.EVENTS_BACKEND != "redis":
+        raise ValueError(f"未知的事件后端: {settings.EVENTS_BACKEND}")
+    return create_shared_backend("redis")
+
+
+# 全局事件广播器实例
+event_broadcaster = EventBroadcaster(_create_backend())
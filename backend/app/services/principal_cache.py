@@ -0,0 +1,78 @@
+"""
+认证用户缓存
+
+按令牌缓存已验证的当前用户，避免每个认证请求都查询数据库；
+用户信息更新时按用户失效，过期时间用于兜底其他进程的更新。
+"""
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+from ..core.cache import LRUCache
+from ..core.config import settings
+from ..schemas.user import User
+
+
+class PrincipalCache:
+    """认证用户缓存"""
+
+    def __init__(self):
+        self._entries = LRUCache(settings.PRINCIPAL_CACHE_MAX_ENTRIES)
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+
+    @property
+    def hits(self) -> int:
+        """缓存命中次数"""
+        return self._entries.hits
+
+    @property
+    def misses(self) -> int:
+        """缓存未命中次数"""
+        return self._entries.misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[User]:
+        """获取令牌对应的用户，令牌过期或用户已更新时返回None"""
+        entry = self._entries.get(self._key(token))
+        if entry is None:
+            return None
+        user, expires_at, version = entry
+        if expires_at <= time.time() or self._versions.get(user.id, 0) != version:
+            return None
+        return user
+
+    def version(self, user_id: int) -> int:
+        """用户的当前版本，查询数据库前读取并传给 set"""
+        return self._versions.get(user_id, 0)
+
+    def set(self, token: str, user: User, expires_at: float, version: int) -> None:
+        """
+        缓存令牌对应的用户
+
+        Args:
+            expires_at: 令牌过期时间戳
+            version: 查询数据库前读取的用户版本，查询期间用户被更新时缓存项立即失效
+        """
+        self._entries.set(
+            self._key(token), (user, expires_at, version), settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+
+    def invalidate_user(self, user_id: int) -> None:
+        """使该用户的所有缓存失效"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+
+# 全局认证用户缓存实例
+principal_cache = PrincipalCache()
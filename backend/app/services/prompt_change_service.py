@@ -0,0 +1,110 @@
+"""
+提示词变更订阅服务
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import DateTime, func, literal, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.pagination import encode_cursor, decode_cursor, keyset_after
+from ..models.prompt import Prompt
+from ..models.prompt_tombstone import PromptTombstone
+from ..schemas.prompt import Prompt as PromptSchema, PromptChange, PromptChangeFeed
+from .base import AsyncServiceWrapper
+
+# SQLite 中由 CURRENT_TIMESTAMP 生成的时间只精确到秒，且以文本比较，
+# 绑定参数时需使用相同的格式
+CHANGE_TIMESTAMP = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
+class PromptChangeService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_changes(self, since: Optional[str] = None, limit: int = 100) -> PromptChangeFeed:
+        """
+        获取游标之后的提示词变更
+
+        公开提示词按 (updated_at, id) 顺序返回最新内容，删除和取消公开按记录顺序返回
+        delete 事件，两者按时间合并。为避免遗漏尚未提交的并发事务，只返回早于稳定时间点的变更。
+
+        Args:
+            since: 上一批返回的 next_cursor，不传时从头开始
+            limit: 每批最多返回的变更数量
+
+        Raises:
+            ValueError: 游标无效
+        """
+        updated_at, last_id, last_tombstone_id = self._decode(since)
+        horizon = self.db.scalar(select(func.now())) - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+        horizon = literal(horizon, CHANGE_TIMESTAMP)
+
+        query = self.db.query(Prompt).filter(Prompt.is_public == True, Prompt.updated_at <= horizon)
+        if updated_at is not None:
+            query = query.filter(keyset_after(
+                (Prompt.updated_at, Prompt.id),
+                (literal(updated_at, CHANGE_TIMESTAMP), last_id),
+                descending=False
+            ))
+        prompts = query.order_by(Prompt.updated_at, Prompt.id).limit(limit + 1).all()
+
+        tombstones = self.db.query(PromptTombstone).filter(
+            PromptTombstone.id > last_tombstone_id,
+            PromptTombstone.created_at <= horizon
+        ).order_by(PromptTombstone.id).limit(limit + 1).all()
+
+        # 按时间归并两个有序序列，同一时间先删除后更新；各自只消费前缀，游标才能续读
+        changes = []
+        p = t = 0
+        while len(changes) < limit and (p < len(prompts) or t < len(tombstones)):
+            if t < len(tombstones) and (p == len(prompts) or tombstones[t].created_at <= prompts[p].updated_at):
+                tombstone = tombstones[t]
+                changes.append(PromptChange(
+                    op="delete", id=tombstone.prompt_id,
+                    changed_at=tombstone.created_at, reason=tombstone.reason
+                ))
+                last_tombstone_id = tombstone.id
+                t += 1
+            else:
+                prompt = prompts[p]
+                changes.append(PromptChange(
+                    op="upsert", id=prompt.id,
+                    changed_at=prompt.updated_at, prompt=PromptSchema.model_validate(prompt)
+                ))
+                updated_at, last_id = prompt.updated_at, prompt.id
+                p += 1
+
+        return PromptChangeFeed(
+            changes=changes,
+            next_cursor=encode_cursor("changes", [
+                updated_at.isoformat() if updated_at else None, last_id, last_tombstone_id
+            ]),
+            has_more=p < len(prompts) or t < len(tombstones)
+        )
+
+    @staticmethod
+    def _decode(since: Optional[str]) -> Tuple[Optional[datetime], int, int]:
+        """解析游标，返回 (更新时间, 提示词ID, 删除记录ID)"""
+        if not since:
+            return None, 0, 0
+        updated_at, last_id, last_tombstone_id = decode_cursor(since, "changes", 3)
+        try:
+            if updated_at is not None:
+                updated_at = datetime.fromisoformat(updated_at)
+            return updated_at, int(last_id), int(last_tombstone_id)
+        except (TypeError, ValueError):
+            raise ValueError("无效的游标")
+
+
+class AsyncPromptChangeService(AsyncServiceWrapper):
+    """提示词变更订阅服务（异步版本）"""
+    service_class = PromptChangeService
+
+    async def get_changes(self, since: Optional[str] = None, limit: int = 100) -> PromptChangeFeed:
+        return await self._call("get_changes", since, limit=limit)
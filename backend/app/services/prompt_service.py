@@ -1,12 +1,42 @@
 """
 提示词服务
 """
-from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
+import heapq
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
+from sqlalchemy.orm import Session, Query
 from sqlalchemy import or_, func
+from ..core.cache import response_cache
+from ..core.config import settings
+from ..core.pagination import encode_cursor, decode_cursor, keyset_after
 from ..models.prompt import Prompt
 from ..models.category import Category
-from ..schemas.prompt import PromptCreate, PromptUpdate, PromptList
+from ..models.user import User
+from ..models.prompt_tombstone import PromptTombstone
+from ..schemas.prompt import (
+    Prompt as PromptSchema, PromptCreate, PromptUpdate, PromptList, PromptRowPage, EXPAND_FIELDS, row_to_dict
+)
+from .base import AsyncServiceWrapper
+from .count_cache import count_cache
+from .event_broadcaster import event_broadcaster
+from .search_index import search_index
+from .usage_counter import usage_counter
+
+# 可展开的关联对应的模型
+EXPAND_MODELS = {
+    "author": User,
+    "category": Category,
+}
+
+# 排序方式对应的排序列（均为降序，末列为唯一的ID，同时作为键集分页的键）
+SORT_COLUMNS = {
+    "newest": (Prompt.id,),
+    "usage": (Prompt.usage_count, Prompt.id),
+    "rating": (Prompt.rating_avg, Prompt.rating_count, Prompt.id),
+    "featured": (Prompt.is_featured, Prompt.id),
+}
+
+# 决定详情响应内容版本的列：updated_at 不含使用次数和评分的变化
+VERSION_COLUMNS = (Prompt.updated_at, Prompt.usage_count, Prompt.rating_avg, Prompt.rating_count)
 
 
 class PromptService:
@@ -17,8 +47,30 @@ class PromptService:
         """获取提示词"""
         return self.db.query(Prompt).filter(Prompt.id == prompt_id).first()
 
-    def get_list(self, page: int = 1, size: int = 20, **filters) -> PromptList:
-        """获取提示词列表"""
+    def get_list(
+        self,
+        page: int = 1,
+        size: int = 20,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        count_mode: str = "exact",
+        fields: Optional[Sequence[str]] = None,
+        expand: Sequence[str] = (),
+        **filters
+    ) -> Union[PromptList, PromptRowPage]:
+        """
+        获取提示词列表
+
+        sort 为空时搜索结果按相关度排序，其余按最新排序；
+        cursor 不为None时使用游标分页（空字符串表示第一页），此时忽略 page。
+        count_mode 为 estimate 时，结果集很大的总数返回近似值（仅 PostgreSQL）。
+        指定 fields 时只查询所需的列，返回直接序列化的 PromptRowPage，
+        expand 中的关联按整页批量加载后嵌入。
+
+        Raises:
+            ValueError: 游标无效
+        """
         query = self.db.query(Prompt)
         
         # 应用筛选条件
@@ -31,41 +83,258 @@ class PromptService:
         if filters.get("is_featured"):
             query = query.filter(Prompt.is_featured == True)
         
+        # 处理用户权限
+        query = self._apply_visibility(query, filters.get("current_user_id"))
+        
+        ranked_ids = None
         if filters.get("search"):
-            search_term = f"%{filters['search']}%"
-            query = query.filter(
-                or_(
-                    Prompt.name_zh.ilike(search_term),
-                    Prompt.name_en.ilike(search_term),
-                    Prompt.description.ilike(search_term)
+            ranked_ids = self._search_ids(filters)
+            if ranked_ids is None:
+                search_term = f"%{filters['search']}%"
+                query = query.filter(
+                    or_(
+                        Prompt.name_zh.ilike(search_term),
+                        Prompt.name_en.ilike(search_term),
+                        Prompt.description.ilike(search_term)
+                    )
                 )
-            )
         
-        # 处理用户权限
-        if filters.get("current_user_id"):
-            current_user_id = filters["current_user_id"]
-            query = query.filter(
-                or_(
-                    Prompt.is_public == True,
-                    Prompt.author_id == current_user_id
-                )
-            )
+        use_cursor = cursor is not None
+        next_cursor = None
+        total_estimated = False
+        if ranked_ids is not None and sort is None:
+            # 索引已应用筛选条件，按相关度取出当前页的ID后只查询这一页
+            total = len(ranked_ids)
+            if use_cursor:
+                # 相关度结果已在内存中，游标记录的是排名位置
+                offset = decode_cursor(cursor, "rank", 1)[0] if cursor else 0
+                if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+                    raise ValueError("无效的游标")
+            else:
+                offset = (page - 1) * size
+            page_ids = ranked_ids[offset:offset + size]
+            rows = {}
+            if page_ids:
+                # 索引可能尚未同步其他进程的写入，当前页仍由数据库校验筛选条件
+                rows = {
+                    row.id: row
+                    for row in query.with_entities(*self._entities(fields)).filter(Prompt.id.in_(page_ids))
+                }
+            items = [rows[prompt_id] for prompt_id in page_ids if prompt_id in rows]
+            if use_cursor and offset + size < total:
+                next_cursor = encode_cursor("rank", [offset + size])
         else:
-            query = query.filter(Prompt.is_public == True)
-        
-        # 计算总数
-        total = query.count()
+            # 计算总数（可选），索引已应用筛选条件时命中数量即为总数
+            total = None
+            if include_total:
+                if ranked_ids is not None:
+                    total = len(ranked_ids)
+                else:
+                    total, total_estimated = self._count(query, filters, count_mode)
+            
+            sort = sort or "newest"
+            columns = SORT_COLUMNS[sort]
+            query = query.order_by(*[column.desc() for column in columns])
+            query = query.with_entities(*self._entities(fields, columns))
+            
+            if use_cursor:
+                # 键集分页：从上一页最后一条记录的排序键之后继续
+                if cursor:
+                    values = self._cursor_values(columns, decode_cursor(cursor, sort, len(columns)))
+                    query = query.filter(keyset_after(columns, values))
+                rows = self._fetch_sorted(query, columns, ranked_ids, 0, size + 1)
+                items = rows[:size]
+                if len(rows) > size:
+                    next_cursor = encode_cursor(
+                        sort, [getattr(items[-1], column.key) for column in columns]
+                    )
+            else:
+                # 分页
+                items = self._fetch_sorted(query, columns, ranked_ids, (page - 1) * size, size)
         
-        # 分页
-        offset = (page - 1) * size
-        items = query.offset(offset).limit(size).all()
-        
-        return PromptList(
-            items=items,
+        page_info = dict(
             total=total,
-            page=page,
+            total_estimated=total_estimated,
+            page=None if use_cursor else page,
             size=size,
-            pages=(total + size - 1) // size
+            pages=None if total is None else (total + size - 1) // size,
+            next_cursor=next_cursor
+        )
+        if fields:
+            expansions = self.load_expansions(items, expand) if expand else None
+            return PromptRowPage(items=items, fields=fields, expansions=expansions, **page_info)
+        return PromptList(items=items, **page_info)
+
+    def _fetch_sorted(
+        self, query: Query, columns: tuple, ranked_ids: Optional[List[int]], offset: int, limit: int
+    ) -> list:
+        """
+        按排序取出 offset 之后的 limit 行，ranked_ids 不为None时只取搜索命中的行
+
+        命中的ID不会整体交给数据库：不超过一批时用一次 IN 查询；否则先只读取ID和排序列确定当前页——
+        命中占比高时按排序顺序分批扫描，保留命中的行；否则分批 IN 查询，每批只取排序靠前的行后合并，
+        再按ID读取当前页。
+        """
+        if ranked_ids is None:
+            return query.offset(offset).limit(limit).all()
+        if not ranked_ids:
+            return []
+        batch_size = settings.SEARCH_SQL_BATCH_SIZE
+        if len(ranked_ids) <= batch_size:
+            return query.filter(Prompt.id.in_(ranked_ids)).offset(offset).limit(limit).all()
+        
+        wanted = offset + limit
+        hits = set(ranked_ids)
+        keys = query.with_entities(*dict.fromkeys((Prompt.id,) + columns))
+        # 顺序扫描约需读取 wanted * 总数 / 命中数 行，分批 IN 查询需读取全部命中行
+        if wanted * len(search_index) <= len(hits) * len(hits):
+            key_rows = self._scan_sorted(keys, columns, hits, wanted)
+        else:
+            key_rows = []
+            for start in range(0, len(ranked_ids), batch_size):
+                key_rows.extend(keys.filter(Prompt.id.in_(ranked_ids[start:start + batch_size])).limit(wanted))
+            key_rows = heapq.nlargest(
+                wanted, key_rows, key=lambda row: tuple(getattr(row, column.key) for column in columns)
+            )
+        page_ids = [row.id for row in key_rows[offset:]]
+        if not page_ids:
+            return []
+        rows = {row.id: row for row in query.filter(Prompt.id.in_(page_ids))}
+        return [rows[prompt_id] for prompt_id in page_ids if prompt_id in rows]
+
+    @staticmethod
+    def _scan_sorted(query: Query, columns: tuple, hits: set, wanted: int) -> list:
+        """按排序顺序分批读取，保留命中的行，直到取满 wanted 行"""
+        batch_size = settings.SEARCH_SQL_BATCH_SIZE
+        rows = []
+        batch_query = query
+        while len(rows) < wanted:
+            batch = batch_query.limit(batch_size).all()
+            rows.extend(row for row in batch if row.id in hits)
+            if len(batch) < batch_size:
+                break
+            last = [getattr(batch[-1], column.key) for column in columns]
+            batch_query = query.filter(keyset_after(columns, last))
+        return rows[:wanted]
+
+    @staticmethod
+    def _entities(fields: Optional[Sequence[str]], extra_columns: tuple = ()) -> tuple:
+        """
+        查询的实体：未指定字段时为完整的 ORM 实例，
+        否则只选择所需字段的列，并附带 ID、关联外键和排序列
+        """
+        if not fields:
+            return (Prompt,)
+        names = dict.fromkeys(
+            ("id",) + tuple(fields) + ("author_id", "category_id")
+            + tuple(column.key for column in extra_columns)
+        )
+        return tuple(getattr(Prompt, name) for name in names)
+
+    def load_expansions(self, items: Sequence[Any], relations: Sequence[str]) -> Dict[str, Dict[int, dict]]:
+        """
+        批量加载展开的关联，每个关联对整页只执行一次 IN 查询
+
+        Returns:
+            关联名到 {ID: 摘要} 的映射
+        """
+        expansions = {}
+        for relation in relations:
+            model = EXPAND_MODELS[relation]
+            fields = EXPAND_FIELDS[relation]
+            ids = {getattr(item, f"{relation}_id") for item in items}
+            rows = []
+            if ids:
+                columns = [getattr(model, field) for field in fields]
+                rows = self.db.query(*columns).filter(model.id.in_(ids))
+            expansions[relation] = {row.id: row_to_dict(row, fields) for row in rows}
+        return expansions
+
+    def get_fields(self, prompt_id: int, fields: Sequence[str]):
+        """获取提示词的指定字段（附带权限检查和 ETag 所需的字段）"""
+        entities = self._entities(fields, (Prompt.is_public,) + VERSION_COLUMNS)
+        return self.db.query(*entities).filter(Prompt.id == prompt_id).first()
+
+    def get_version(self, prompt_id: int):
+        """获取提示词的版本信息，用于条件请求时无需读取完整内容"""
+        return self.db.query(
+            Prompt.id, Prompt.is_public, Prompt.author_id, *VERSION_COLUMNS
+        ).filter(Prompt.id == prompt_id).first()
+
+    def _count(self, query: Query, filters: Dict[str, Any], count_mode: str) -> Tuple[int, bool]:
+        """
+        计算列表总数，结果按规范化的筛选条件缓存
+
+        Returns:
+            (总数, 是否为近似值)
+        """
+        search = filters.get("search")
+        key = (
+            count_mode,
+            filters.get("category_id") or None,
+            filters.get("is_public"),
+            bool(filters.get("is_featured")),
+            filters.get("current_user_id") or None,
+            " ".join(search.lower().split()) if search else None,
+        )
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if count_mode == "estimate":
+            result = self._estimate_count(query)
+        else:
+            result = (query.count(), False)
+        count_cache.set(key, result)
+        return result
+
+    def _estimate_count(self, query: Query) -> Tuple[int, bool]:
+        """
+        近似总数：先做有上限的计数，达到上限时 PostgreSQL 使用查询计划的行数估算，
+        其他数据库没有可用的估算，返回精确总数（由调用方缓存）
+        """
+        threshold = settings.COUNT_ESTIMATE_THRESHOLD
+        bounded = query.with_entities(Prompt.id).limit(threshold).subquery()
+        count = self.db.query(func.count()).select_from(bounded).scalar()
+        if count < threshold:
+            return count, False
+        
+        bind = self.db.get_bind()
+        if bind.dialect.name != "postgresql":
+            return query.count(), False
+        compiled = query.statement.compile(
+            dialect=bind.dialect, compile_kwargs={"render_postcompile": True}
+        )
+        plan = self.db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        return max(count, int(plan[0]["Plan"]["Plan Rows"])), True
+
+    @staticmethod
+    def _cursor_values(columns: tuple, values: List[Any]) -> List[Any]:
+        """按列类型校验游标中的排序键"""
+        for column, value in zip(columns, values):
+            expected = column.type.python_type
+            if expected is float and isinstance(value, int) and not isinstance(value, bool):
+                continue
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise ValueError("无效的游标")
+        return values
+
+    def _search_ids(self, filters: Dict[str, Any]) -> Optional[List[int]]:
+        """通过搜索索引获取符合筛选条件、按相关度排序的ID，索引不可用时返回None"""
+        if not settings.SEARCH_INDEX_ENABLED:
+            return None
+        search_index.ensure_loaded(self.db)
+        # 后台线程尚未构建完成时回退到数据库查询
+        if not search_index.loaded:
+            return None
+        return search_index.search(
+            filters["search"],
+            category_id=filters.get("category_id"),
+            is_public=filters.get("is_public"),
+            is_featured=bool(filters.get("is_featured")),
+            current_user_id=filters.get("current_user_id")
         )
 
     def create(self, prompt_create: PromptCreate, author_id: int) -> Prompt:
@@ -77,6 +346,10 @@ class PromptService:
         self.db.add(db_prompt)
         self.db.commit()
         self.db.refresh(db_prompt)
+        search_index.add(db_prompt)
+        self._invalidate_caches()
+        if db_prompt.is_public:
+            self._publish("prompt.created", db_prompt)
         return db_prompt
 
     def update(self, prompt_id: int, prompt_update: PromptUpdate) -> Optional[Prompt]:
@@ -85,12 +358,22 @@ class PromptService:
         if not db_prompt:
             return None
         
+        was_public = db_prompt.is_public
         update_data = prompt_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_prompt, field, value)
         
+        # 取消公开对变更订阅方而言等同于删除
+        if was_public and not db_prompt.is_public:
+            self.db.add(PromptTombstone(prompt_id=prompt_id, reason="hidden"))
         self.db.commit()
         self.db.refresh(db_prompt)
+        search_index.add(db_prompt)
+        self._invalidate_caches()
+        if db_prompt.is_public:
+            self._publish("prompt.updated", db_prompt)
+        elif was_public:
+            event_broadcaster.publish("prompt.deleted", {"id": prompt_id, "reason": "hidden"})
         return db_prompt
 
     def delete(self, prompt_id: int) -> bool:
@@ -99,18 +382,84 @@ class PromptService:
         if not db_prompt:
             return False
         
+        was_public = db_prompt.is_public
+        if was_public:
+            self.db.add(PromptTombstone(prompt_id=prompt_id, reason="deleted"))
         self.db.delete(db_prompt)
         self.db.commit()
+        search_index.remove(prompt_id)
+        self._invalidate_caches()
+        if was_public:
+            event_broadcaster.publish("prompt.deleted", {"id": prompt_id, "reason": "deleted"})
         return True
 
+    @staticmethod
+    def _publish(event_type: str, db_prompt: Prompt) -> None:
+        """发布公开提示词的变更事件"""
+        event_broadcaster.publish(event_type, PromptSchema.model_validate(db_prompt).model_dump(mode="json"))
+
+    @staticmethod
+    def _apply_visibility(query: Query, current_user_id: Optional[int]) -> Query:
+        """可见性：公开的提示词，以及当前用户自己的提示词"""
+        if current_user_id:
+            return query.filter(
+                or_(
+                    Prompt.is_public == True,
+                    Prompt.author_id == current_user_id
+                )
+            )
+        return query.filter(Prompt.is_public == True)
+
+    def get_many(
+        self,
+        prompt_ids: Sequence[int],
+        current_user_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> list:
+        """
+        批量获取提示词
+
+        一次 IN 查询，应用与列表相同的可见性规则，结果按传入 ID 的顺序排列，
+        不存在或不可见的 ID 被忽略。
+        """
+        if not prompt_ids:
+            return []
+        query = self.db.query(*self._entities(fields)).filter(Prompt.id.in_(prompt_ids))
+        query = self._apply_visibility(query, current_user_id)
+        rows = {row.id: row for row in query}
+        return [rows[prompt_id] for prompt_id in dict.fromkeys(prompt_ids) if prompt_id in rows]
+
+    def _invalidate_caches(self) -> None:
+        """提示词写入后使相关缓存失效"""
+        count_cache.invalidate()
+        response_cache.invalidate("prompt_list", "prompt_detail")
+
     def category_exists(self, category_id: int) -> bool:
         """检查分类是否存在"""
         return self.db.query(Category).filter(Category.id == category_id).first() is not None
 
     def increment_usage_count(self, prompt_id: int) -> None:
-        """增加使用次数"""
+        """增加使用次数（默认先在内存中累计，由后台批量写入）"""
+        if settings.USAGE_COUNTER_BUFFERED:
+            usage_counter.increment(prompt_id)
+            return
+        # 使用次数不算内容更新，保持 updated_at 不变
         self.db.query(Prompt).filter(Prompt.id == prompt_id).update(
-            {Prompt.usage_count: Prompt.usage_count + 1}
+            {Prompt.usage_count: Prompt.usage_count + 1, Prompt.updated_at: Prompt.updated_at}
+        )
+        self.db.commit()
+
+    def increment_usage_counts(self, prompt_ids: Sequence[int]) -> None:
+        """批量增加使用次数，未启用缓冲时用一条 UPDATE 完成"""
+        if not prompt_ids:
+            return
+        if settings.USAGE_COUNTER_BUFFERED:
+            for prompt_id in prompt_ids:
+                usage_counter.increment(prompt_id)
+            return
+        self.db.query(Prompt).filter(Prompt.id.in_(prompt_ids)).update(
+            {Prompt.usage_count: Prompt.usage_count + 1, Prompt.updated_at: Prompt.updated_at},
+            synchronize_session=False
         )
         self.db.commit()
 
@@ -118,4 +467,61 @@ class PromptService:
         """获取指定用户的所有提示词"""
         return self.db.query(Prompt).filter(
             Prompt.author_id == user_id
-        ).offset(skip).limit(limit).all() 
\ No newline at end of file
+        ).offset(skip).limit(limit).all()
+
+
+class AsyncPromptService(AsyncServiceWrapper):
+    """提示词服务（异步版本）"""
+    service_class = PromptService
+
+    async def get(self, prompt_id: int) -> Optional[Prompt]:
+        return await self._call("get", prompt_id)
+
+    async def get_list(self, page: int = 1, size: int = 20, **kwargs) -> Union[PromptList, PromptRowPage]:
+        return await self._call("get_list", page=page, size=size, **kwargs)
+
+    async def get_fields(self, prompt_id: int, fields: Sequence[str]):
+        return await self._call("get_fields", prompt_id, fields)
+
+    async def get_version(self, prompt_id: int):
+        return await self._call("get_version", prompt_id)
+
+    async def load_expansions(self, items: Sequence[Any], relations: Sequence[str]) -> Dict[str, Dict[int, dict]]:
+        return await self._call("load_expansions", items, relations)
+
+    async def create(self, prompt_create: PromptCreate, author_id: int) -> Prompt:
+        return await self._call("create", prompt_create, author_id=author_id)
+
+    async def update(self, prompt_id: int, prompt_update: PromptUpdate) -> Optional[Prompt]:
+        return await self._call("update", prompt_id, prompt_update)
+
+    async def delete(self, prompt_id: int) -> bool:
+        return await self._call("delete", prompt_id)
+
+    async def category_exists(self, category_id: int) -> bool:
+        return await self._call("category_exists", category_id)
+
+    async def increment_usage_count(self, prompt_id: int) -> None:
+        if settings.USAGE_COUNTER_BUFFERED:
+            # 只在内存中累加，无需切换到数据库上下文
+            usage_counter.increment(prompt_id)
+            return
+        await self._call("increment_usage_count", prompt_id)
+
+    async def get_many(
+        self,
+        prompt_ids: Sequence[int],
+        current_user_id: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> list:
+        return await self._call("get_many", prompt_ids, current_user_id=current_user_id, fields=fields)
+
+    async def increment_usage_counts(self, prompt_ids: Sequence[int]) -> None:
+        if settings.USAGE_COUNTER_BUFFERED:
+            for prompt_id in prompt_ids:
+                usage_counter.increment(prompt_id)
+            return
+        await self._call("increment_usage_counts", prompt_ids)
+
+    async def get_prompts_by_user(self, user_id: int, skip: int = 0, limit: int = 100):
+        return await self._call("get_prompts_by_user", user_id, skip=skip, limit=limit)
@@ -0,0 +1,384 @@
+"""
+提示词搜索索引
+
+进程内倒排索引：中文按二元组（单字片段按单字）切分，英文按单词切分并支持前缀匹配，
+使用 BM25 对结果排序。索引同时记录每个文档的可见性、精选、作者和分类，列表的筛选条件在索引中完成，
+无需把全部命中结果交给数据库过滤。索引由 PromptService 的写操作增量维护，
+应用启动后由后台线程构建，并按刷新间隔同步其他进程的写入和删除。
+"""
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from operator import itemgetter
+from typing import Optional, List, Dict, Iterable, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.prompt import Prompt
+
+logger = logging.getLogger(__name__)
+
+# 中文（含日文假名、韩文）字符片段与英文/数字单词
+_CJK_RUN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# 各字段的权重
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name_zh": 3.0,
+    "name_en": 3.0,
+    "aliases": 2.5,
+    "tags": 2.0,
+    "description": 1.0,
+}
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 单个英文前缀最多展开的词数
+MAX_PREFIX_EXPANSION = 50
+
+
+def _cjk_tokens(run: str) -> List[str]:
+    """中文片段切分：单字输出单字，多字输出二元组"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """文档切分：中文二元组和单字、英文单词"""
+    if not text:
+        return []
+    text = text.lower()
+    tokens: List[str] = []
+    for run in _CJK_RUN.findall(text):
+        tokens.extend(run)
+        if len(run) > 1:
+            tokens.extend(_cjk_tokens(run))
+    tokens.extend(_WORD.findall(text))
+    return tokens
+
+
+def tokenize_query(text: str) -> List[Tuple[str, bool]]:
+    """
+    查询切分
+
+    Returns:
+        (词元, 是否按前缀匹配) 列表，英文单词按前缀匹配
+    """
+    text = text.lower()
+    terms: List[Tuple[str, bool]] = []
+    for run in _CJK_RUN.findall(text):
+        terms.extend((token, False) for token in _cjk_tokens(run))
+    terms.extend((word, True) for word in _WORD.findall(text))
+    # 去重并保持顺序
+    return list(dict.fromkeys(terms))
+
+
+def _join(values: Optional[Iterable[str]]) -> str:
+    """拼接JSON列表字段"""
+    if not values:
+        return ""
+    return " ".join(str(value) for value in values)
+
+
+class SearchIndex:
+    """倒排索引"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+        self._words: List[str] = []
+        # 筛选用的文档属性：(是否公开, 是否精选, 作者ID, 分类ID)，以及按属性分组的文档集合
+        self._doc_attrs: Dict[int, Tuple[bool, bool, int, int]] = {}
+        self._public: Set[int] = set()
+        self._featured: Set[int] = set()
+        self._by_author: Dict[int, Set[int]] = {}
+        self._by_category: Dict[int, Set[int]] = {}
+        self._loaded = False
+        self._checked_at = 0.0
+        self._watermark = None
+        # 构建和同步互斥；搜索和写入只在更新索引结构时持有 _lock
+        self._refresh_lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def clear(self) -> None:
+        """清空索引"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len = 0.0
+            self._words = []
+            self._doc_attrs.clear()
+            self._public.clear()
+            self._featured.clear()
+            self._by_author.clear()
+            self._by_category.clear()
+            self._loaded = False
+            self._watermark = None
+
+    def add(self, prompt: Prompt) -> None:
+        """添加或替换文档"""
+        fields = {
+            "name_zh": prompt.name_zh,
+            "name_en": prompt.name_en,
+            "aliases": _join(prompt.aliases),
+            "tags": _join(prompt.tags),
+            "description": prompt.description,
+        }
+        terms: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+
+        with self._lock:
+            self._remove(prompt.id)
+            self._doc_terms[prompt.id] = terms
+            length = sum(terms.values())
+            self._doc_len[prompt.id] = length
+            self._total_len += length
+            for token, tf in terms.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    if token.isascii():
+                        insort(self._words, token)
+                postings[prompt.id] = tf
+            attrs = (bool(prompt.is_public), bool(prompt.is_featured), prompt.author_id, prompt.category_id)
+            self._doc_attrs[prompt.id] = attrs
+            if attrs[0]:
+                self._public.add(prompt.id)
+            if attrs[1]:
+                self._featured.add(prompt.id)
+            self._by_author.setdefault(attrs[2], set()).add(prompt.id)
+            self._by_category.setdefault(attrs[3], set()).add(prompt.id)
+
+    def remove(self, prompt_id: int) -> None:
+        """删除文档"""
+        with self._lock:
+            self._remove(prompt_id)
+
+    def _remove(self, prompt_id: int) -> None:
+        terms = self._doc_terms.pop(prompt_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(prompt_id)
+        for token in terms:
+            postings = self._postings[token]
+            postings.pop(prompt_id, None)
+            if not postings:
+                del self._postings[token]
+                if token.isascii():
+                    index = bisect_left(self._words, token)
+                    if index < len(self._words) and self._words[index] == token:
+                        del self._words[index]
+        _, _, author_id, category_id = self._doc_attrs.pop(prompt_id)
+        self._public.discard(prompt_id)
+        self._featured.discard(prompt_id)
+        for groups, key in ((self._by_author, author_id), (self._by_category, category_id)):
+            docs = groups[key]
+            docs.discard(prompt_id)
+            if not docs:
+                del groups[key]
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        """将查询词元展开为索引中的词元"""
+        if not prefix:
+            return [term] if term in self._postings else []
+        expanded = []
+        index = bisect_left(self._words, term)
+        while index < len(self._words) and len(expanded) < MAX_PREFIX_EXPANSION:
+            word = self._words[index]
+            if not word.startswith(term):
+                break
+            expanded.append(word)
+            index += 1
+        return expanded
+
+    def search(
+        self,
+        query: str,
+        category_id: Optional[int] = None,
+        is_public: Optional[bool] = None,
+        is_featured: bool = False,
+        current_user_id: Optional[int] = None
+    ) -> Optional[List[int]]:
+        """
+        搜索
+
+        所有查询词元都需命中（英文前缀展开后任一命中即可），结果按 BM25 得分降序。
+        筛选条件与列表相同：公开的提示词以及 current_user_id 自己的提示词可见。
+
+        Returns:
+            按相关度排序的提示词ID列表；查询中没有可索引的词元时返回None
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            return None
+
+        with self._lock:
+            groups = [self._expand(term, prefix) for term, prefix in terms]
+            if not all(groups):
+                return []
+
+            # 候选集为各词元组命中文档的交集，从最小的组开始
+            group_docs = []
+            for tokens in groups:
+                docs = set()
+                for token in tokens:
+                    docs.update(self._postings[token])
+                group_docs.append(docs)
+            group_docs.sort(key=len)
+            candidates = group_docs[0]
+            for docs in group_docs[1:]:
+                candidates = candidates & docs
+                if not candidates:
+                    return []
+            candidates = self._filter(candidates, category_id, is_public, is_featured, current_user_id)
+            if not candidates:
+                return []
+
+            total_docs = len(self._doc_terms)
+            avg_len = self._total_len / total_docs if total_docs else 1.0
+            scores: Dict[int, float] = {}
+            for tokens in groups:
+                for token in tokens:
+                    postings = self._postings[token]
+                    df = len(postings)
+                    idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                    for doc_id in candidates.intersection(postings):
+                        tf = postings[doc_id]
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_id] / avg_len)
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        # 按 (得分, ID) 降序
+        return [doc_id for doc_id, _ in sorted(scores.items(), key=itemgetter(1, 0), reverse=True)]
+
+    def _filter(
+        self,
+        candidates: Set[int],
+        category_id: Optional[int],
+        is_public: Optional[bool],
+        is_featured: bool,
+        current_user_id: Optional[int]
+    ) -> Set[int]:
+        """按列表的筛选条件和可见性过滤候选文档"""
+        if is_public is not None:
+            candidates = candidates & self._public if is_public else candidates - self._public
+        visible = candidates & self._public
+        if current_user_id:
+            visible |= candidates & self._by_author.get(current_user_id, set())
+        if category_id:
+            visible &= self._by_category.get(category_id, set())
+        if is_featured:
+            visible &= self._featured
+        return visible
+
+    @property
+    def loaded(self) -> bool:
+        """索引是否已构建完成"""
+        return self._loaded
+
+    def ensure_loaded(self, db: Session) -> None:
+        """
+        未启动后台线程时（如脚本中），首次使用时从数据库构建索引，之后按刷新间隔同步其他进程的写入
+
+        启动后台线程后构建和同步都在后台线程中进行，这里不做任何事。
+        """
+        if self._thread is not None:
+            return
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < settings.SEARCH_INDEX_REFRESH_SECONDS:
+            return
+        self.refresh(db)
+
+    def refresh(self, db: Session) -> None:
+        """尚未构建时全量构建，否则增量同步"""
+        with self._refresh_lock:
+            if not self._loaded:
+                self.rebuild(db)
+            else:
+                self._sync(db)
+
+    def _sync(self, db: Session) -> None:
+        """增量同步：重新索引水位线之后更新过的行，并移除数据库中已不存在的文档"""
+        query = db.query(*self._columns())
+        if self._watermark is not None:
+            query = query.filter(Prompt.updated_at >= self._watermark)
+        self._load(query)
+        # 先取索引中的ID再查询数据库，之后写入索引的新文档不会被误删
+        with self._lock:
+            indexed = set(self._doc_terms)
+        existing = {prompt_id for prompt_id, in db.query(Prompt.id)}
+        for prompt_id in indexed - existing:
+            self.remove(prompt_id)
+        self._checked_at = time.monotonic()
+
+    def rebuild(self, db: Session) -> None:
+        """
+        从数据库全量重建索引
+
+        读取数据库时不持有锁，构建完成前 loaded 为 False，搜索回退到数据库查询。
+        """
+        with self._refresh_lock:
+            self.clear()
+            self._load(db.query(*self._columns()))
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    def start(self) -> None:
+        """启动后台线程：构建索引，之后按刷新间隔同步其他进程的写入"""
+        if not settings.SEARCH_INDEX_ENABLED or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            db = SessionLocal()
+            try:
+                self.refresh(db)
+            except Exception:
+                logger.exception("同步搜索索引失败")
+            finally:
+                db.close()
+            self._stopping.wait(settings.SEARCH_INDEX_REFRESH_SECONDS)
+
+    def _load(self, query) -> None:
+        for row in query.yield_per(1000):
+            self.add(row)
+            if row.updated_at is not None and (self._watermark is None or row.updated_at > self._watermark):
+                self._watermark = row.updated_at
+
+    @staticmethod
+    def _columns() -> tuple:
+        return (
+            Prompt.id, Prompt.name_zh, Prompt.name_en, Prompt.aliases,
+            Prompt.tags, Prompt.description, Prompt.updated_at,
+            Prompt.is_public, Prompt.is_featured, Prompt.author_id, Prompt.category_id,
+        )
+
+
+# 全局搜索索引实例
+search_index = SearchIndex()
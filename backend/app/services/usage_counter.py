@@ -0,0 +1,155 @@
+"""
+提示词使用次数计数器
+
+使用次数先在内存中累加（可选汇总到共享后端），由后台线程按时间间隔或累计数量
+批量写入数据库，避免每次读取详情都提交一次事务。
+"""
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional
+from sqlalchemy import case
+from ..core.cache import create_shared_backend
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.prompt import Prompt
+
+logger = logging.getLogger(__name__)
+
+# 共享后端中待写入计数的哈希键
+PENDING_KEY = "usage:pending"
+
+
+class UsageCounter:
+    """写回式使用次数计数器"""
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._pending_total = 0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def increment(self, prompt_id: int, amount: int = 1) -> None:
+        """累加使用次数，达到阈值时唤醒后台线程写入"""
+        with self._lock:
+            self._pending[prompt_id] += amount
+            self._pending_total += amount
+            reached = self._pending_total >= settings.USAGE_FLUSH_THRESHOLD
+        if reached:
+            self._wakeup.set()
+
+    def pending(self) -> Dict[int, int]:
+        """当前进程中尚未写入的计数"""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self) -> int:
+        """
+        将累计的计数写入数据库
+
+        Returns:
+            写入的提示词数量
+        """
+        with self._lock:
+            counts, self._pending = self._pending, Counter()
+            self._pending_total = 0
+
+        if self.shared is not None:
+            counts = self._exchange_shared(counts)
+        if not counts:
+            return 0
+
+        try:
+            self._write(counts)
+        except Exception:
+            logger.exception("写入使用次数失败，计数将在下次重试")
+            self._restore(counts)
+            return 0
+        return len(counts)
+
+    def _exchange_shared(self, counts: Counter) -> Counter:
+        """
+        把本进程计数汇总到共享后端，再取走共享后端中的全部计数
+
+        累加和取走各在一个事务中完成：累加失败时共享后端没有计入任何计数，返回本进程的计数直接写入；
+        取走失败时计数仍在共享后端，下次写入时再取。
+
+        Returns:
+            由本进程写入数据库的计数
+        """
+        if counts:
+            try:
+                with self.shared.pipeline() as pipe:
+                    for prompt_id, amount in counts.items():
+                        pipe.hincrby(PENDING_KEY, str(prompt_id), amount)
+                    pipe.execute()
+            except Exception:
+                logger.exception("汇总使用次数到共享后端失败，由本进程直接写入")
+                return counts
+        try:
+            return self._take_shared()
+        except Exception:
+            logger.exception("读取共享使用次数失败，将在下次写入时重试")
+            return Counter()
+
+    def _take_shared(self) -> Counter:
+        """在一个事务中读取并删除共享后端中的计数"""
+        with self.shared.pipeline() as pipe:
+            pipe.hgetall(PENDING_KEY)
+            pipe.delete(PENDING_KEY)
+            pending, _ = pipe.execute()
+        return Counter({int(prompt_id): int(amount) for prompt_id, amount in pending.items()})
+
+    def _restore(self, counts: Counter) -> None:
+        with self._lock:
+            self._pending.update(counts)
+            self._pending_total += sum(counts.values())
+
+    @staticmethod
+    def _write(counts: Dict[int, int]) -> None:
+        """一条 UPDATE 语句批量累加使用次数"""
+        db = SessionLocal()
+        try:
+            db.query(Prompt).filter(Prompt.id.in_(list(counts))).update(
+                {
+                    Prompt.usage_count: Prompt.usage_count + case(counts, value=Prompt.id, else_=0),
+                    # 使用次数不算内容更新，保持 updated_at 不变
+                    Prompt.updated_at: Prompt.updated_at,
+                },
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        """启动后台写入线程"""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并写入剩余计数"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(settings.USAGE_FLUSH_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                break
+            self.flush()
+
+
+# 全局使用次数计数器实例
+usage_counter = UsageCounter(create_shared_backend(settings.USAGE_COUNTER_SHARED_BACKEND))
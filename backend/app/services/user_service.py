@@ -3,9 +3,12 @@
 """
 from typing import Optional
 from sqlalchemy.orm import Session
-from ..core.security import get_password_hash, verify_password
+from ..core.cache import response_cache
+from ..core.security import get_password_hash, verify_and_update_password, password_hasher
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
+from .base import AsyncServiceWrapper
+from .principal_cache import principal_cache
 
 
 class UserService:
@@ -24,9 +27,17 @@ class UserService:
         """通过用户名获取用户"""
         return self.db.query(User).filter(User.username == username).first()
 
-    def create(self, user_create: UserCreate) -> User:
-        """创建用户"""
-        password_hash = get_password_hash(user_create.password)
+    def get_by_login(self, username: str) -> Optional[User]:
+        """通过用户名或邮箱获取用户"""
+        user = self.get_by_username(username)
+        if not user:
+            user = self.get_by_email(username)
+        return user
+
+    def create(self, user_create: UserCreate, password_hash: Optional[str] = None) -> User:
+        """创建用户（可传入预先计算的密码哈希）"""
+        if password_hash is None:
+            password_hash = get_password_hash(user_create.password)
         db_user = User(
             username=user_create.username,
             email=user_create.email,
@@ -50,19 +61,69 @@ class UserService:
         
         self.db.commit()
         self.db.refresh(db_user)
+        principal_cache.invalidate_user(user_id)
+        # 展开作者信息的提示词响应随之变化
+        response_cache.invalidate("users")
         return db_user
 
+    def set_password_hash(self, user_id: int, password_hash: str) -> None:
+        """更新密码哈希"""
+        db_user = self.get(user_id)
+        if not db_user:
+            return
+        db_user.password_hash = password_hash
+        self.db.commit()
+        self.db.refresh(db_user)
+
     def authenticate(self, username: str, password: str) -> Optional[User]:
         """验证用户"""
         # 尝试通过用户名或邮箱查找用户
-        user = self.get_by_username(username)
+        user = self.get_by_login(username)
+        
         if not user:
-            user = self.get_by_email(username)
+            return None
+        
+        valid, new_hash = verify_and_update_password(password, user.password_hash)
+        if not valid:
+            return None
         
+        # 哈希参数已变更时顺便升级
+        if new_hash:
+            self.set_password_hash(user.id, new_hash)
+        
+        return user
+
+
+class AsyncUserService(AsyncServiceWrapper):
+    """用户服务（异步版本）"""
+    service_class = UserService
+
+    async def get(self, user_id: int) -> Optional[User]:
+        return await self._call("get", user_id)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self._call("get_by_email", email)
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        return await self._call("get_by_username", username)
+
+    async def create(self, user_create: UserCreate) -> User:
+        # 密码哈希在独立线程池中计算
+        password_hash = await password_hasher.hash(user_create.password)
+        return await self._call("create", user_create, password_hash=password_hash)
+
+    async def update(self, user_id: int, user_update: UserUpdate) -> Optional[User]:
+        return await self._call("update", user_id, user_update)
+
+    async def authenticate(self, username: str, password: str) -> Optional[User]:
+        user = await self._call("get_by_login", username)
         if not user:
             return None
         
-        if not verify_password(password, user.password_hash):
+        valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+        if not valid:
             return None
         
-        return user 
\ No newline at end of file
+        if new_hash:
+            await self._call("set_password_hash", user.id, new_hash)
+        return user
@@ -0,0 +1,11 @@
+"""
+压测工具
+
+生成中英文混合的合成数据集，在进程内驱动应用执行典型场景（匿名浏览、搜索、详情读取、
+登录、登录用户写入），按路由输出吞吐量和 p50/p95/p99 延迟，结果为 JSON，可与基线比较。
+
+    cd backend
+    python -m benchmarks --database-url sqlite:///./benchmark.db generate --prompts 100000
+    python -m benchmarks --database-url sqlite:///./benchmark.db run --output result.json
+    python -m benchmarks compare baseline.json result.json
+"""
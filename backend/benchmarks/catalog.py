@@ -0,0 +1,180 @@
+"""
+合成数据生成
+
+按固定随机种子生成可复现的用户、分类、提示词和评分数据，提示词为中英文混合内容。
+"""
+import random
+import time
+from typing import Dict, List
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core.security import get_password_hash
+from app.models.category import Category
+from app.models.prompt import Prompt
+from app.models.rating import Rating
+from app.models.user import User
+
+# 合成用户的统一密码（登录场景使用）
+BENCH_PASSWORD = "bench-password"
+
+TOP_CATEGORIES = ["写作助手", "编程开发", "数据分析", "学习教育", "商务办公", "创意设计", "生活助手", "语言翻译"]
+SUB_CATEGORIES = ["入门", "进阶", "模板", "工作流"]
+
+ZH_TOPICS = [
+    "文章写作", "代码审查", "数据清洗", "市场分析", "邮件回复", "论文润色", "产品文案", "会议纪要",
+    "简历优化", "旅行规划", "健身计划", "食谱推荐", "英语学习", "面试准备", "需求分析", "测试用例",
+    "翻译校对", "故事创作", "诗歌生成", "法律咨询", "财务报表", "用户调研", "品牌命名", "短视频脚本",
+]
+ZH_MODIFIERS = ["专业", "高效", "智能", "简洁", "详细", "创意", "结构化", "多轮", "中文", "双语"]
+ZH_SUFFIXES = ["助手", "模板", "生成器", "顾问", "专家", "指南"]
+ZH_SENTENCES = [
+    "请根据以下要求完成任务。", "输出需要条理清晰，分点说明。", "请先理解用户的背景和目标。",
+    "在回答中给出具体的示例。", "如果信息不足，请先提出澄清问题。", "使用简洁专业的语言。",
+    "最后给出总结和下一步建议。", "注意保持语气友好。", "请按照 Markdown 格式输出。",
+]
+EN_WORDS = [
+    "writing", "assistant", "code", "review", "analysis", "marketing", "email", "research",
+    "summary", "translation", "interview", "planner", "python", "javascript", "sql", "report",
+    "creative", "story", "template", "workflow", "product", "design", "learning", "data",
+]
+TAGS = [
+    "写作", "编程", "翻译", "学习", "效率", "营销", "数据", "创意", "办公", "生活",
+    "python", "gpt", "claude", "productivity", "seo", "email", "career", "education",
+]
+MODELS = ["gpt-4", "gpt-3.5-turbo", "claude-3", "qwen", "glm-4", "llama-3"]
+MODEL_TYPES = ["chat", "completion", "vision"]
+USE_CASES = ["工作", "学习", "生活", "创作", "开发"]
+
+
+def generate_catalog(
+    db: Session,
+    prompts: int = 10000,
+    users: int = 0,
+    rated_fraction: float = 0.2,
+    seed: int = 42,
+    batch_size: int = 5000,
+) -> Dict[str, int]:
+    """
+    生成合成数据
+
+    Args:
+        prompts: 提示词数量
+        users: 用户数量，0 表示按提示词数量推算
+        rated_fraction: 带评分的提示词比例
+        seed: 随机种子，相同参数生成相同的数据
+
+    Returns:
+        各类数据的生成数量
+    """
+    rng = random.Random(seed)
+    users = users or max(10, prompts // 50)
+    started = time.perf_counter()
+
+    user_ids = _generate_users(db, users, batch_size)
+    category_ids = _generate_categories(db)
+
+    ratings: List[dict] = []
+    rows: List[dict] = []
+    for index in range(prompts):
+        row = _prompt_row(rng, index, category_ids, user_ids)
+        if rng.random() < rated_fraction:
+            scores = [rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 6, 5))[0] for _ in range(rng.randint(1, 8))]
+            row["rating_count"] = len(scores)
+            row["rating_avg"] = round(sum(scores) / len(scores), 2)
+            row["_scores"] = scores
+        rows.append(row)
+        if len(rows) >= batch_size:
+            ratings += _insert_prompts(db, rows, user_ids, rng)
+            rows = []
+    if rows:
+        ratings += _insert_prompts(db, rows, user_ids, rng)
+    for start in range(0, len(ratings), batch_size):
+        db.execute(insert(Rating), ratings[start:start + batch_size])
+    db.commit()
+
+    return {
+        "users": len(user_ids),
+        "categories": len(category_ids),
+        "prompts": prompts,
+        "ratings": len(ratings),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def _generate_users(db: Session, count: int, batch_size: int) -> List[int]:
+    """生成用户，所有用户使用同一个密码哈希"""
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    start = (db.query(func.max(User.id)).scalar() or 0) + 1
+    rows = [
+        {
+            "username": f"bench{start + i}",
+            "email": f"bench{start + i}@example.com",
+            "password_hash": password_hash,
+            "full_name": f"测试用户{start + i}",
+            "is_active": True,
+        }
+        for i in range(count)
+    ]
+    for offset in range(0, len(rows), batch_size):
+        db.execute(insert(User), rows[offset:offset + batch_size])
+    db.commit()
+    return [row[0] for row in db.query(User.id).filter(User.id >= start).order_by(User.id)]
+
+
+def _generate_categories(db: Session) -> List[int]:
+    """生成两级分类（已有分类时直接使用）"""
+    existing = [row[0] for row in db.query(Category.id).filter(Category.is_active == True)]
+    if existing:
+        return existing
+    for order, name in enumerate(TOP_CATEGORIES, start=1):
+        parent = Category(name=name, sort_order=order, is_active=True)
+        db.add(parent)
+        db.flush()
+        for sub_order, sub_name in enumerate(SUB_CATEGORIES, start=1):
+            db.add(Category(name=f"{name}{sub_name}", parent_id=parent.id, sort_order=sub_order, is_active=True))
+    db.commit()
+    return [row[0] for row in db.query(Category.id)]
+
+
+def _prompt_row(rng: random.Random, index: int, category_ids: List[int], user_ids: List[int]) -> dict:
+    topic = rng.choice(ZH_TOPICS)
+    name_zh = f"{rng.choice(ZH_MODIFIERS)}{topic}{rng.choice(ZH_SUFFIXES)}{index}"
+    en_words = rng.sample(EN_WORDS, 3)
+    content = "".join(rng.choice(ZH_SENTENCES) for _ in range(rng.randint(5, 40)))
+    content += " " + " ".join(rng.choice(EN_WORDS) for _ in range(rng.randint(10, 80)))
+    return {
+        "name_zh": name_zh,
+        "name_en": " ".join(word.capitalize() for word in en_words),
+        "aliases": [topic, en_words[0]],
+        "description": f"{topic}相关的{rng.choice(ZH_MODIFIERS)}提示词，适用于{rng.choice(USE_CASES)}场景。{en_words[1]} {en_words[2]}",
+        "content": content,
+        "example_input": rng.choice(ZH_SENTENCES),
+        "example_output": rng.choice(ZH_SENTENCES) * 3,
+        "usage_tips": rng.choice(ZH_SENTENCES),
+        "category_id": rng.choice(category_ids),
+        "tags": rng.sample(TAGS, rng.randint(2, 5)),
+        "supported_models": rng.sample(MODELS, rng.randint(1, 3)),
+        "model_types": rng.sample(MODEL_TYPES, 1),
+        "use_cases": rng.sample(USE_CASES, rng.randint(1, 2)),
+        "is_public": rng.random() < 0.85,
+        "is_featured": rng.random() < 0.03,
+        "status": "published",
+        "rating_avg": 0.0,
+        "rating_count": 0,
+        "usage_count": int(rng.paretovariate(1.2)) - 1,
+        "author_id": rng.choice(user_ids),
+    }
+
+
+def _insert_prompts(db: Session, rows: List[dict], user_ids: List[int], rng: random.Random) -> List[dict]:
+    """批量插入提示词，返回对应的评分行"""
+    scores = [row.pop("_scores", None) for row in rows]
+    prompt_ids = db.execute(
+        insert(Prompt).returning(Prompt.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    ratings = []
+    for prompt_id, prompt_scores in zip(prompt_ids, scores):
+        for score in prompt_scores or ():
+            ratings.append({"prompt_id": prompt_id, "user_id": rng.choice(user_ids), "score": score})
+    return ratings
@@ -0,0 +1,268 @@
+"""
+压测入口
+
+    python -m benchmarks generate --prompts 100000
+    python -m benchmarks run --scenarios anonymous_list,detail --concurrency 16 --duration 10 --output result.json
+    python -m benchmarks compare baseline.json result.json
+
+应用在进程内通过 httpx 的 ASGI 传输驱动，不经过网络；其他配置与应用相同，通过环境变量传入。
+应用配置在导入时读取，因此 app 模块在解析参数、设置环境变量之后才导入。
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+class Recorder:
+    """按路由记录延迟和错误数"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.elapsed: Dict[str, float] = {}
+
+    def record(self, route: str, duration: float, status: int) -> None:
+        self.latencies[route].append(duration)
+        if status == 0 or status >= 400:
+            self.errors[route] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            elapsed = self.elapsed.get(route) or 1.0
+            result[route] = {
+                "requests": len(values),
+                "errors": self.errors[route],
+                "throughput": round(len(values) / elapsed, 1),
+                "latency_ms": {
+                    "mean": round(sum(values) / len(values) * 1000, 2),
+                    "p50": round(_percentile(values, 50) * 1000, 2),
+                    "p95": round(_percentile(values, 95) * 1000, 2),
+                    "p99": round(_percentile(values, 99) * 1000, 2),
+                    "max": round(values[-1] * 1000, 2),
+                },
+            }
+        return result
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """最近秩法计算百分位数"""
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def generate(args) -> None:
+    """生成合成数据"""
+    from app.core.database import Base, SessionLocal, engine
+    from .catalog import generate_catalog
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counts = generate_catalog(db, prompts=args.prompts, users=args.users, seed=args.seed)
+    finally:
+        db.close()
+    print(json.dumps(counts, ensure_ascii=False))
+
+
+def _load_context(client, writers: int):
+    """从数据库采样场景使用的ID，并为写入用户签发令牌"""
+    from datetime import timedelta
+    from app.core.database import SessionLocal
+    from app.core.security import create_access_token
+    from app.models.category import Category
+    from app.models.prompt import Prompt
+    from app.models.user import User
+    from .scenarios import BenchmarkContext
+
+    db = SessionLocal()
+    try:
+        # 按使用次数排序，详情场景的热点分布落在热门提示词上
+        prompt_ids = [row[0] for row in db.query(Prompt.id).filter(Prompt.is_public == True)
+                      .order_by(Prompt.usage_count.desc(), Prompt.id).limit(10000)]
+        category_ids = [row[0] for row in db.query(Category.id).filter(Category.is_active == True)]
+        users = db.query(User.id, User.username).filter(User.is_active == True).order_by(User.id).limit(200).all()
+        if not prompt_ids or not users:
+            raise SystemExit("数据库中没有数据，请先运行 python -m benchmarks generate")
+        ctx = BenchmarkContext(
+            client=client,
+            prompt_ids=prompt_ids,
+            category_ids=category_ids,
+            usernames=[user.username for user in users],
+        )
+        for user in users[:writers]:
+            token = create_access_token(subject=user.id, expires_delta=timedelta(hours=2))
+            own_ids = [row[0] for row in db.query(Prompt.id).filter(Prompt.author_id == user.id).limit(50)]
+            ctx.writers.append(({"Authorization": f"Bearer {token}"}, own_ids))
+        return ctx, db.query(Prompt).count()
+    finally:
+        db.close()
+
+
+async def _drive(ctx, name: str, concurrency: int, duration: float, seed: int, recorder: Optional[Recorder]) -> None:
+    """以固定并发执行场景直到时间用完"""
+    from .scenarios import SCENARIOS
+
+    scenario = SCENARIOS[name]
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def worker(index: int) -> None:
+        rng = random.Random(f"{seed}:{name}:{index}")
+        while time.perf_counter() < deadline:
+            request_started = time.perf_counter()
+            try:
+                route, status = await scenario(ctx, rng)
+            except Exception:
+                route, status = name, 0
+            if recorder is not None:
+                recorder.record(route, time.perf_counter() - request_started, status)
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    if recorder is not None:
+        # 场景产生的路由标签以整个场景的时长计算吞吐量
+        for route in recorder.latencies:
+            recorder.elapsed.setdefault(route, time.perf_counter() - started)
+
+
+async def run_benchmark(args) -> dict:
+    """依次执行各场景：先预热，再按并发和时长计时"""
+    import httpx
+    from app.main import app
+    from .scenarios import SCENARIOS
+
+    names = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"未知的场景: {', '.join(unknown)}")
+
+    recorder = Recorder()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            ctx, prompt_count = _load_context(client, args.concurrency)
+            for name in names:
+                if args.warmup > 0:
+                    await _drive(ctx, name, args.concurrency, args.warmup, args.seed, None)
+                await _drive(ctx, name, args.concurrency, args.duration, args.seed, recorder)
+                print(f"{name}: 完成", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": os.environ["DATABASE_URL"].split("://", 1)[0],
+            "prompts": prompt_count,
+            "scenarios": names,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "routes": recorder.summary(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """
+    比较两次结果，输出各路由的 p95 和吞吐量变化
+
+    Returns:
+        有路由退化超过阈值（百分比）时返回1，否则返回0
+    """
+    regressed = False
+    print(f"{'路由':<28}{'p95 基线':>12}{'p95 当前':>12}{'变化':>10}{'吞吐 基线':>12}{'吞吐 当前':>12}{'变化':>10}")
+    for route, now in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        p95_change = _change(before["latency_ms"]["p95"], now["latency_ms"]["p95"])
+        throughput_change = _change(before["throughput"], now["throughput"])
+        flag = ""
+        if p95_change > threshold or throughput_change < -threshold:
+            regressed = True
+            flag = "  退化"
+        print(
+            f"{route:<28}{before['latency_ms']['p95']:>12}{now['latency_ms']['p95']:>12}{p95_change:>+9.1f}%"
+            f"{before['throughput']:>12}{now['throughput']:>12}{throughput_change:>+9.1f}%{flag}"
+        )
+    return 1 if regressed else 0
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="提示词平台压测")
+    parser.add_argument("--database-url", help="数据库地址，默认使用 DATABASE_URL 或 sqlite:///./benchmark.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="生成合成数据")
+    generate_parser.add_argument("--prompts", type=int, default=10000)
+    generate_parser.add_argument("--users", type=int, default=0, help="默认按提示词数量推算")
+    generate_parser.add_argument("--seed", type=int, default=42)
+
+    run_parser = commands.add_parser("run", help="执行压测")
+    run_parser.add_argument("--scenarios", default="all", help="逗号分隔的场景名，或 all")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--duration", type=float, default=10.0, help="每个场景的计时秒数")
+    run_parser.add_argument("--warmup", type=float, default=2.0, help="每个场景的预热秒数")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    run_parser.add_argument("--compare", help="与基线结果比较")
+    run_parser.add_argument("--threshold", type=float, default=10.0, help="判定退化的百分比")
+
+    compare_parser = commands.add_parser("compare", help="比较两次压测结果")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        return compare(baseline, current, args.threshold)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+
+    if args.command == "generate":
+        generate(args)
+        return 0
+
+    result = asyncio.run(run_benchmark(args))
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return compare(json.load(f), result, args.threshold)
+    return 0
@@ -0,0 +1,97 @@
+"""
+压测场景
+
+每个场景是一个协程，发出一个请求并返回 (路由标签, 状态码)；
+随机数由调用方按工作协程分配，相同种子下请求序列可复现。
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Tuple
+import httpx
+
+from .catalog import BENCH_PASSWORD, EN_WORDS, TAGS, ZH_TOPICS
+
+API = "/api/v1"
+
+
+@dataclass
+class BenchmarkContext:
+    """场景共享的数据：客户端和从数据库采样的ID"""
+    client: httpx.AsyncClient
+    prompt_ids: List[int]
+    category_ids: List[int]
+    usernames: List[str]
+    # 每个写入用户的认证头和其提示词ID
+    writers: List[Tuple[Dict[str, str], List[int]]] = field(default_factory=list)
+
+
+Scenario = Callable[[BenchmarkContext, random.Random], Awaitable[Tuple[str, int]]]
+
+
+async def anonymous_list(ctx: BenchmarkContext, rng: random.Random) -> Tuple[str, int]:
+    """匿名浏览列表：页码分页、排序和分类筛选"""
+    params = {"page": rng.randint(1, 20), "size": 20}
+    if rng.random() < 0.5:
+        params["sort"] = rng.choice(("newest", "usage", "rating", "featured"))
+    if rng.random() < 0.3:
+        params["category_id"] = rng.choice(ctx.category_ids)
+    response = await ctx.client.get(f"{API}/prompts/", params=params)
+    return "GET /prompts/", response.status_code
+
+
+async def search(ctx: BenchmarkContext, rng: random.Random) -> Tuple[str, int]:
+    """关键词搜索：中文主题、标签和英文前缀"""
+    term = rng.choice((rng.choice(ZH_TOPICS), rng.choice(TAGS), rng.choice(EN_WORDS)[:4]))
+    response = await ctx.client.get(f"{API}/prompts/", params={"search": term, "size": 20})
+    return "GET /prompts/?search", response.status_code
+
+
+async def detail(ctx: BenchmarkContext, rng: random.Random) -> Tuple[str, int]:
+    """读取详情（计入使用次数），访问集中在少数热门提示词"""
+    index = min(int(rng.paretovariate(1.1)) - 1, len(ctx.prompt_ids) - 1)
+    response = await ctx.client.get(f"{API}/prompts/{ctx.prompt_ids[index]}")
+    return "GET /prompts/{id}", response.status_code
+
+
+async def login(ctx: BenchmarkContext, rng: random.Random) -> Tuple[str, int]:
+    """登录（bcrypt 校验）"""
+    response = await ctx.client.post(
+        f"{API}/auth/login",
+        data={"username": rng.choice(ctx.usernames), "password": BENCH_PASSWORD}
+    )
+    return "POST /auth/login", response.status_code
+
+
+async def authenticated_write(ctx: BenchmarkContext, rng: random.Random) -> Tuple[str, int]:
+    """登录用户创建或修改自己的提示词"""
+    headers, own_ids = rng.choice(ctx.writers)
+    if own_ids and rng.random() < 0.7:
+        response = await ctx.client.put(
+            f"{API}/prompts/{rng.choice(own_ids)}",
+            json={"description": f"更新 {rng.random():.6f}"},
+            headers=headers
+        )
+        return "PUT /prompts/{id}", response.status_code
+    response = await ctx.client.post(
+        f"{API}/prompts/",
+        json={
+            "name_zh": f"压测{rng.choice(ZH_TOPICS)}",
+            "content": "请根据以下要求完成任务。" * 10,
+            "category_id": rng.choice(ctx.category_ids),
+            "tags": rng.sample(TAGS, 3),
+            "is_public": True,
+        },
+        headers=headers
+    )
+    if response.status_code == 200:
+        own_ids.append(response.json()["id"])
+    return "POST /prompts/", response.status_code
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "anonymous_list": anonymous_list,
+    "search": search,
+    "detail": detail,
+    "login": login,
+    "authenticated_write": authenticated_write,
+}
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+检查迁移与模型是否一致
+
+在临时 SQLite 数据库上执行全部迁移，再与 ORM 模型比较，模型有未写入迁移的修改时以非零状态退出；
+同时检查全部回滚后能否重新升级。修改模型后需要新增迁移：
+
+    alembic revision --autogenerate -m "说明"
+"""
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alembic import command
+from alembic.util import AutogenerateDiffsDetected
+from init_db import alembic_config
+
+
+def check_migrations() -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        config = alembic_config()
+        config.set_main_option("sqlalchemy.url", f"sqlite:///{os.path.join(directory, 'check.db')}")
+        command.upgrade(config, "head")
+        try:
+            command.check(config)
+        except AutogenerateDiffsDetected as e:
+            print(f"模型与迁移不一致：\n{e}")
+            return 1
+        command.downgrade(config, "base")
+        command.upgrade(config, "head")
+    print("模型与迁移一致")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(check_migrations())
@@ -1,14 +1,38 @@
 """
 数据库初始化脚本
+
+通过 Alembic 迁移创建或升级表结构。引入迁移之前由 create_all 创建的数据库没有版本记录，
+先标记为初始版本，再执行后续迁移。
 """
-from app.core.database import engine, Base
-from app.models import user, category, prompt, rating
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from app.core.database import engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 引入迁移前的表结构对应的版本
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    """读取 backend/alembic.ini，与工作目录无关"""
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    return config
+
 
 def init_db():
     """初始化数据库"""
-    print("正在创建数据库表...")
-    Base.metadata.create_all(bind=engine)
-    print("数据库表创建完成！")
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        print("检测到未纳入迁移管理的数据库，标记为初始版本...")
+        command.stamp(config, BASELINE_REVISION)
+    print("正在执行数据库迁移...")
+    command.upgrade(config, "head")
+    print("数据库迁移完成！")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db()
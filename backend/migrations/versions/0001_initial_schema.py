@@ -0,0 +1,116 @@
+"""
+初始表结构（与引入迁移前 init_db.py 创建的表一致）
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False, comment="用户名"),
+        sa.Column("email", sa.String(length=100), nullable=False, comment="邮箱"),
+        sa.Column("password_hash", sa.String(length=255), nullable=False, comment="密码哈希"),
+        sa.Column("full_name", sa.String(length=100), nullable=True, comment="真实姓名"),
+        sa.Column("bio", sa.Text(), nullable=True, comment="个人简介"),
+        sa.Column("location", sa.String(length=100), nullable=True, comment="位置"),
+        sa.Column("website", sa.String(length=255), nullable=True, comment="个人网站"),
+        sa.Column("avatar_url", sa.String(length=255), nullable=True, comment="头像URL"),
+        sa.Column("is_active", sa.Boolean(), nullable=True, comment="是否激活"),
+        sa.Column("is_premium", sa.Boolean(), nullable=True, comment="是否高级用户"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True, comment="更新时间"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False, comment="分类名称"),
+        sa.Column("description", sa.Text(), nullable=True, comment="分类描述"),
+        sa.Column("parent_id", sa.Integer(), nullable=True, comment="父分类ID"),
+        sa.Column("sort_order", sa.Integer(), nullable=True, comment="排序"),
+        sa.Column("icon", sa.String(length=50), nullable=True, comment="图标"),
+        sa.Column("is_active", sa.Boolean(), nullable=True, comment="是否启用"),
+        sa.ForeignKeyConstraint(["parent_id"], ["categories.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_categories_id", "categories", ["id"])
+    op.create_index("ix_categories_name", "categories", ["name"])
+
+    op.create_table(
+        "prompts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name_zh", sa.String(length=200), nullable=False, comment="中文名称"),
+        sa.Column("name_en", sa.String(length=200), nullable=True, comment="英文名称"),
+        sa.Column("aliases", sa.JSON(), nullable=True, comment="别名列表"),
+        sa.Column("description", sa.Text(), nullable=True, comment="描述"),
+        sa.Column("content", sa.Text(), nullable=False, comment="提示词内容"),
+        sa.Column("example_input", sa.Text(), nullable=True, comment="示例输入"),
+        sa.Column("example_output", sa.Text(), nullable=True, comment="示例输出"),
+        sa.Column("usage_tips", sa.Text(), nullable=True, comment="使用技巧"),
+        sa.Column("category_id", sa.Integer(), nullable=False, comment="分类ID"),
+        sa.Column("tags", sa.JSON(), nullable=True, comment="标签列表"),
+        sa.Column("supported_models", sa.JSON(), nullable=True, comment="支持的模型"),
+        sa.Column("model_types", sa.JSON(), nullable=True, comment="模型类型"),
+        sa.Column("use_cases", sa.JSON(), nullable=True, comment="使用场景"),
+        sa.Column("is_public", sa.Boolean(), nullable=True, comment="是否公开"),
+        sa.Column("is_featured", sa.Boolean(), nullable=True, comment="是否精选"),
+        sa.Column("status", sa.String(length=20), nullable=True, comment="状态：draft/published/archived"),
+        sa.Column("rating_avg", sa.Float(), nullable=True, comment="平均评分"),
+        sa.Column("rating_count", sa.Integer(), nullable=True, comment="评分数量"),
+        sa.Column("usage_count", sa.Integer(), nullable=True, comment="使用次数"),
+        sa.Column("author_id", sa.Integer(), nullable=False, comment="作者ID"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True, comment="更新时间"),
+        sa.ForeignKeyConstraint(["author_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["category_id"], ["categories.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_prompts_id", "prompts", ["id"])
+    op.create_index("ix_prompts_name_zh", "prompts", ["name_zh"])
+    op.create_index("ix_prompts_name_en", "prompts", ["name_en"])
+
+    op.create_table(
+        "ratings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("prompt_id", sa.Integer(), nullable=False, comment="提示词ID"),
+        sa.Column("user_id", sa.Integer(), nullable=False, comment="用户ID"),
+        sa.Column("score", sa.Integer(), nullable=False, comment="评分 (1-5)"),
+        sa.Column("comment", sa.Text(), nullable=True, comment="评价内容"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True, comment="创建时间"),
+        sa.ForeignKeyConstraint(["prompt_id"], ["prompts.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ratings_id", "ratings", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ratings_id", table_name="ratings")
+    op.drop_table("ratings")
+    op.drop_index("ix_prompts_name_en", table_name="prompts")
+    op.drop_index("ix_prompts_name_zh", table_name="prompts")
+    op.drop_index("ix_prompts_id", table_name="prompts")
+    op.drop_table("prompts")
+    op.drop_index("ix_categories_name", table_name="categories")
+    op.drop_index("ix_categories_id", table_name="categories")
+    op.drop_table("categories")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,39 @@
+"""
+提示词删除记录表（变更订阅）
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 引入迁移前由 init_db.py 创建的数据库可能已有该表
+    if sa.inspect(op.get_bind()).has_table("prompt_tombstones"):
+        return
+    op.create_table(
+        "prompt_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("prompt_id", sa.Integer(), nullable=False, comment="提示词ID"),
+        sa.Column("reason", sa.String(length=20), nullable=False, comment="原因：deleted/hidden"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True, comment="记录时间"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_prompt_tombstones_id", "prompt_tombstones", ["id"])
+    op.create_index("ix_prompt_tombstones_prompt_id", "prompt_tombstones", ["prompt_id"])
+    op.create_index("ix_prompt_tombstones_created", "prompt_tombstones", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_prompt_tombstones_created", table_name="prompt_tombstones")
+    op.drop_index("ix_prompt_tombstones_prompt_id", table_name="prompt_tombstones")
+    op.drop_index("ix_prompt_tombstones_id", table_name="prompt_tombstones")
+    op.drop_table("prompt_tombstones")
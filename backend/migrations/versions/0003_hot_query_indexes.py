@@ -0,0 +1,51 @@
+"""
+列表、按作者查询、分类检查和评分汇总所需的索引
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (索引名, 表名, 列)；引入迁移前由 init_db.py 创建的数据库可能已有部分索引
+INDEXES = [
+    # 列表按可见性筛选后排序：最新、使用次数、评分、精选
+    ("ix_prompts_public_newest", "prompts", ["is_public", "id"]),
+    ("ix_prompts_public_usage", "prompts", ["is_public", "usage_count", "id"]),
+    ("ix_prompts_public_rating", "prompts", ["is_public", "rating_avg", "rating_count", "id"]),
+    ("ix_prompts_public_featured", "prompts", ["is_public", "is_featured", "id"]),
+    # 分类筛选，以及分类删除前检查是否有关联提示词
+    ("ix_prompts_category_public_newest", "prompts", ["category_id", "is_public", "id"]),
+    # 登录用户可见自己的提示词、按作者查询
+    ("ix_prompts_author_newest", "prompts", ["author_id", "id"]),
+    # 变更订阅
+    ("ix_prompts_public_updated", "prompts", ["is_public", "updated_at", "id"]),
+    # 评分汇总和用户评分
+    ("ix_ratings_prompt_score", "ratings", ["prompt_id", "score"]),
+    ("ix_ratings_user_prompt", "ratings", ["user_id", "prompt_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    # 精选且公开的部分索引
+    op.create_index(
+        "ix_prompts_featured_newest", "prompts", ["id"],
+        postgresql_where=sa.text("is_featured AND is_public"),
+        sqlite_where=sa.text("is_featured = 1 AND is_public = 1"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_prompts_featured_newest", table_name="prompts")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""
+提示词的排序和筛选列不允许为空
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:00:03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (列名, 类型, 服务端默认值)
+COLUMNS = [
+    ("is_public", sa.Boolean(), sa.false()),
+    ("is_featured", sa.Boolean(), sa.false()),
+    ("rating_avg", sa.Float(), sa.text("0")),
+    ("rating_count", sa.Integer(), sa.text("0")),
+    ("usage_count", sa.Integer(), sa.text("0")),
+]
+
+
+def upgrade() -> None:
+    # 默认值只在 Python 端设置，直接写入数据库的行可能为空
+    prompts = sa.table("prompts", *[sa.column(name, type_) for name, type_, _ in COLUMNS])
+    for name, _, default in COLUMNS:
+        op.execute(prompts.update().where(prompts.c[name].is_(None)).values({name: default}))
+    with op.batch_alter_table("prompts") as batch_op:
+        for name, type_, default in COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, nullable=False, server_default=default)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("prompts") as batch_op:
+        for name, type_, _ in COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, nullable=True, server_default=None)
@@ -114,6 +114,7 @@ deploy_backend() {
     
     # 初始化数据库
     log_info "初始化数据库..."
+    python init_db.py
     python init_categories.py
     
     # 启动后端服务